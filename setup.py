@@ -14,6 +14,7 @@ setuptools.setup(
     license="MIT",
     url="https://github.com/squishykid/solax",
     packages=setuptools.find_packages(exclude=["tests", "tests.*"]),
+    package_data={"solax": ["manifest.json"]},
     install_requires=[
         "aiohttp>=3.5.4, <4",
         "voluptuous>=0.11.5",
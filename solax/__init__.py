@@ -1,16 +1,36 @@
 """Support for Solax inverter via local API."""
 
+from __future__ import annotations
+
 import asyncio
+import importlib
 import logging
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
 
-from solax.discovery import discover
-from solax.inverter import Inverter, InverterResponse
-from solax.inverter_http_client import REQUEST_TIMEOUT
+if TYPE_CHECKING:  # pragma: no cover
+    from solax.discovery import discover, discover_iter
+    from solax.history import History
+    from solax.inverter import Inverter, InverterResponse
+    from solax.inverter_http_client import REQUEST_TIMEOUT
+    from solax.units import Measurement
 
 _LOGGER = logging.getLogger(__name__)
 
+# loaded on first use, so that importing solax.units or solax.utils
+# does not import the network stack and every inverter
+_LAZY = {
+    "discover": "solax.discovery",
+    "discover_iter": "solax.discovery",
+    "History": "solax.history",
+    "Inverter": "solax.inverter",
+    "InverterResponse": "solax.response_parser",
+    "REQUEST_TIMEOUT": "solax.inverter_http_client",
+}
+
 __all__ = (
     "discover",
+    "discover_iter",
+    "History",
     "real_time_api",
     "rt_request",
     "Inverter",
@@ -20,6 +40,14 @@ __all__ = (
 )
 
 
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    globals()[name] = value
+    return value
+
+
 async def rt_request(inv: Inverter, retry, t_wait=0) -> InverterResponse:
     """Make call to inverter endpoint."""
     if t_wait > 0:
@@ -37,20 +65,62 @@ async def rt_request(inv: Inverter, retry, t_wait=0) -> InverterResponse:
         raise
 
 
-async def real_time_api(ip_address, port=80, pwd=""):
-    i = await discover(ip_address, port, pwd, return_when=asyncio.FIRST_COMPLETED)
-    return RealTimeAPI(i)
+async def real_time_api(
+    ip_address, port=80, pwd="", history_size=0, sensors=None, *, keep_session=False
+):
+    # pylint: disable=import-outside-toplevel,too-many-arguments
+    from solax.discovery import discover
+    from solax.history import History
+
+    i = await discover(
+        ip_address,
+        port,
+        pwd,
+        return_when=asyncio.FIRST_COMPLETED,
+        keep_session=keep_session,
+    )
+    api = RealTimeAPI(i, sensors=sensors)
+    if history_size:
+        api.history = History.for_inverter(api.inverter, history_size)
+    return api
 
 
 class RealTimeAPI:
     """Solax inverter real time API"""
 
-    # pylint: disable=too-few-public-methods
-
-    def __init__(self, inv: Inverter):
-        """Initialize the API client."""
+    def __init__(
+        self,
+        inv: Inverter,
+        history: Optional[History] = None,
+        sensors: Optional[Iterable[str]] = None,
+    ):
+        """
+        Initialize the API client, which only decodes the given
+        sensors when there are some.
+        """
+        if sensors is not None:
+            inv = inv.with_sensors(sensors)
         self.inverter = inv
+        self.history = history
+
+    async def __aenter__(self) -> RealTimeAPI:
+        await self.inverter.__aenter__()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the session and the connections of the inverter"""
+        await self.inverter.close()
+
+    def sensor_map(self) -> Dict[str, Tuple[int, Measurement]]:
+        """The sensors decoded, like `Inverter.sensor_map`"""
+        return self.inverter.sensor_map()
 
     async def get_data(self) -> InverterResponse:
         """Query the real time API"""
-        return await rt_request(self.inverter, 3)
+        response = await rt_request(self.inverter, 3)
+        if self.history is not None:
+            self.history.append(response)
+        return response
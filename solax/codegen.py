@@ -0,0 +1,92 @@
+"""Generate the mapping of a response decoder as specialized Python code"""
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from solax import utils
+from solax.response_parser import ResponseDecoder
+
+__all__ = ("decoder_source", "generate_decoder")
+
+DecodeFunction = Callable[[Sequence[Any]], Dict[str, Any]]
+
+_SIGNED = [f"if v > {utils.INT16_MAX}:", f"    v -= {2**16}"]
+_SIGNED32 = [f"if v > {utils.INT32_MAX}:", f"    v -= {2**32}"]
+
+# statements transforming `v` like the processors of solax.utils
+_INLINED: Dict[Callable[[Any], Any], List[str]] = {
+    utils.div10: ["v = v / 10"],
+    utils.div100: ["v = v / 100"],
+    utils.to_signed: _SIGNED,
+    utils.to_signed32: _SIGNED32,
+    utils.twoway_div10: [*_SIGNED, "v = v / 10"],
+    utils.twoway_div100: [*_SIGNED, "v = v / 100"],
+}
+
+_u16_packer = utils.pack_u16(0)[1]
+
+
+class _Source:
+    def __init__(self, convert: bool):
+        self.convert = convert
+        self.lines = ["def decode(d):", "    result = {}"]
+        self.namespace: Dict[str, Any] = {}
+
+    def read(self, idx: int) -> str:
+        return f"float(d[{idx}])" if self.convert else f"d[{idx}]"
+
+    def bind(self, function: Callable) -> str:
+        """Name a callable which is not inlined, in the generated module"""
+        name = f"_f{len(self.namespace)}"
+        self.namespace[name] = function
+        return name
+
+    def emit(self, *statements: str) -> None:
+        self.lines.extend("    " + statement for statement in statements)
+
+
+def decoder_source(
+    decoder: ResponseDecoder, convert: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Return the source of a `decode(data)` function mapping data like the
+    decoder, and the namespace of the callables it can not inline. With
+    `convert`, the values read from data are converted to floats first.
+    """
+    source = _Source(convert)
+    for name, (idx, _, *processors) in decoder.items():
+        if isinstance(idx, (tuple, list)):
+            indexes, packer = idx
+            reads = [source.read(i) for i in indexes]
+            if packer is _u16_packer:
+                terms = [f"{read} * {2 ** (16 * n)}" for n, read in enumerate(reads)]
+                source.emit("v = " + " + ".join(["0.0", *terms]))
+            else:
+                source.emit(f"v = {source.bind(packer)}({', '.join(reads)})")
+        else:
+            source.emit(f"v = {source.read(idx)}")
+
+        for processor in processors:
+            inlined = _INLINED.get(processor)
+            if inlined is None:
+                inlined = [f"v = {source.bind(processor)}(v)"]
+            source.emit(*inlined)
+        source.emit(f"result[{name!r}] = v")
+
+    source.emit("return result")
+    return "\n".join(source.lines) + "\n", source.namespace
+
+
+def generate_decoder(
+    decoder: ResponseDecoder, convert: bool = False, name: str = "decode"
+) -> DecodeFunction:
+    """
+    Compile a function equivalent to `ResponseParser.map_response` for
+    this decoder, with direct indexing and the arithmetic of the known
+    packer and processors inlined instead of called.
+    """
+    source, namespace = decoder_source(decoder, convert)
+    # pylint: disable-next=exec-used
+    exec(compile(source, f"<solax.codegen {name}>", "exec"), namespace)
+    decode = namespace["decode"]
+    decode.__name__ = decode.__qualname__ = name
+    return decode
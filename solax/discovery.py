@@ -1,14 +1,61 @@
 import asyncio
+import functools
+import json
 import logging
+import os
 import sys
+import tempfile
+import time
 from asyncio import Future, Task
-from collections import defaultdict
-from typing import Dict, Literal, Sequence, Set, Type, TypedDict, Union, cast
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypedDict,
+    Union,
+    cast,
+)
+from urllib.parse import urlsplit
+
+from voluptuous import Invalid
 
 from solax.inverter import Inverter
 from solax.inverter_http_client import InverterHttpClient
-
-__all__ = ("discover", "DiscoveryKeywords", "DiscoveryError")
+from solax.manifest import (
+    Signature,
+    build_probe,
+    class_signature,
+    entry_signature,
+    load_manifest,
+    signature_matches,
+)
+from solax.response_parser import PreparsedResponse
+
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+
+__all__ = (
+    "discover",
+    "discover_iter",
+    "DiscoveryIterKeywords",
+    "DiscoveryKeywords",
+    "DiscoveryError",
+    "ProbeRecord",
+)
 
 if sys.version_info >= (3, 10):
     from importlib.metadata import entry_points
@@ -20,18 +67,149 @@ if sys.version_info >= (3, 11):
 else:
     from typing_extensions import Unpack
 
-# registry of inverters
-REGISTRY: Set[Type[Inverter]] = {
-    ep.load()
-    for ep in entry_points(group="solax.inverter")
-    if issubclass(ep.load(), Inverter)
-}
-
 logging.basicConfig(level=logging.INFO)
 
 
-class DiscoveryKeywords(TypedDict, total=False):
+def _check_decoders(inverters) -> None:
+    for cls in inverters:
+        try:
+            cls.check_decoder()
+        except ValueError as ex:
+            logging.warning("Inconsistent inverter %s", ex)
+
+
+def _entry_points() -> Dict[str, Any]:
+    """The registered entry points, per "module:class" they load"""
+    return {ep.value: ep for ep in entry_points(group="solax.inverter")}
+
+
+def __getattr__(name: str):
+    # the registry of inverters imports every one of them, so it is only
+    # loaded when used: discovery builds the probes from the manifest
+    if name != "REGISTRY":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    registry = {
+        cls
+        for cls in (ep.load() for ep in _entry_points().values())
+        if issubclass(cls, Inverter)
+    }
+    _check_decoders(registry)
+    globals()["REGISTRY"] = registry
+    return registry
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    REGISTRY: Set[Type[Inverter]]
+
+
+# successful discoveries per probe, whose probes are sent first afterwards
+PROBE_SUCCESSES: "Counter[Tuple[Any, ...]]" = Counter()
+
+# where PROBE_SUCCESSES is kept between runs, only in memory when None
+PROBE_STATS_PATH: Optional[Path] = None
+# the stats files already merged into PROBE_SUCCESSES
+_LOADED_STATS: Set[Path] = set()
+
+
+def _read_probe_stats(path: Path) -> "Counter[Tuple[Any, ...]]":
+    stats: "Counter[Tuple[Any, ...]]" = Counter()
+    try:
+        with open(path, encoding="utf-8") as saved:
+            for (method, url_path, params, headers), count in json.load(saved):
+                key = (method, url_path, params, tuple(map(tuple, headers)))
+                stats[key] += count
+    except FileNotFoundError:
+        pass
+    except (OSError, TypeError, ValueError) as ex:
+        logging.warning("Ignoring the probe stats of %s: %s", path, ex)
+        stats.clear()
+    return stats
+
+
+def _save_probe_stats(path: Path, successes: "Counter[Tuple[Any, ...]]") -> None:
+    """
+    Add `successes` to the stats saved at `path`, which other processes
+    may update as well, through a temporary file replacing it
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stats = _read_probe_stats(path) + successes
+        handle, written = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as saved:
+                json.dump(list(stats.items()), saved)
+            os.replace(written, path)
+        except BaseException:
+            os.unlink(written)
+            raise
+    except OSError as ex:
+        logging.warning("Could not save the probe stats to %s: %s", path, ex)
+
+
+async def _load_probe_stats() -> None:
+    path = PROBE_STATS_PATH
+    if path is None or path in _LOADED_STATS:
+        return
+    _LOADED_STATS.add(path)
+    loop = asyncio.get_running_loop()
+    PROBE_SUCCESSES.update(await loop.run_in_executor(None, _read_probe_stats, path))
+
+
+async def _count_probe_success(http_client: InverterHttpClient) -> None:
+    key = probe_key(http_client)
+    PROBE_SUCCESSES[key] += 1
+    path = PROBE_STATS_PATH
+    if path is not None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _save_probe_stats, path, Counter([key]))
+
+
+def probe_key(http_client: InverterHttpClient) -> Tuple[Any, ...]:
+    """
+    What identifies a probe, whatever the inverter it is sent to and
+    its password: the method, path, headers and where the params go
+    """
+    if http_client.query:
+        params = "query"
+    else:
+        params = "data" if http_client.data else ""
+    return (
+        http_client.method.name,
+        urlsplit(http_client.url).path,
+        params,
+        tuple(sorted(http_client.headers.items())),
+    )
+
+
+class ProbeRecord(NamedTuple):
+    """
+    What happened to one variant of an inverter class during discovery.
+    `stage` is the last step reached: "queued" before the request is sent,
+    then "request", "preparse", "signature", "parse", and "done" once the
+    data was decoded. `status` is the HTTP status of a failed request,
+    and `path` the voluptuous path of the first validation error.
+    """
+
+    inverter: str
+    variant: str
+    stage: str
+    elapsed: Optional[float] = None
+    status: Optional[int] = None
+    received: Optional[int] = None
+    error: Optional[str] = None
+    path: Optional[Tuple[Any, ...]] = None
+
+
+class DiscoveryIterKeywords(TypedDict, total=False):
     inverters: Sequence[Type[Inverter]]
+    on_probe: Callable[[ProbeRecord], None]
+    session: "aiohttp.ClientSession"
+    timeout: float
+    transport: str
+
+
+class DiscoveryKeywords(DiscoveryIterKeywords, total=False):
+    keep_session: bool
     return_when: Literal["ALL_COMPLETED", "FIRST_COMPLETED"]
 
 
@@ -41,119 +219,320 @@ else:
     _InverterTask = Task
 
 
+class _Candidate(NamedTuple):
+    """An inverter class to try, built only once a response fits its signature"""
+
+    name: str
+    signature: Signature
+    build: Callable[[InverterHttpClient], Inverter]
+    # imported by `build`, once a response fits its signature
+    lazy: bool = False
+
+
+def _prebuilt(inverter: Inverter, http_client: InverterHttpClient) -> Inverter:
+    inverter.http_client = http_client
+    return inverter
+
+
+def _load(entry_point: Any, http_client: InverterHttpClient) -> Inverter:
+    cls = entry_point.load()
+    _check_decoders([cls])
+    return cls(http_client)
+
+
+def _candidates(
+    host, port, pwd="", inverters: Optional[Iterable[Type[Inverter]]] = None
+) -> Iterator[Tuple[_Candidate, InverterHttpClient]]:
+    """
+    The classes to try and the probe to try each with: the variants of
+    `inverters`, or the probes of the manifest for the registered classes
+    it describes, which are then imported only when a response fits them
+    """
+    if inverters is None:
+        registered = _entry_points()
+        shipped = load_manifest()["inverters"]
+        for name, entry in shipped.items():
+            entry_point = registered.pop(entry["class"], None)
+            if entry_point is None:
+                continue
+            candidate = _Candidate(
+                name,
+                entry_signature(entry),
+                functools.partial(_load, entry_point),
+                lazy=True,
+            )
+            for probe in entry["pwd_probes" if pwd else "probes"]:
+                yield candidate, build_probe(probe, host, port, pwd)
+        # the classes registered after the manifest was built
+        inverters = [
+            cls
+            for cls in (ep.load() for ep in registered.values())
+            if issubclass(cls, Inverter)
+        ]
+
+    for cls in inverters:
+        for inverter in cls.build_all_variants(host, port, pwd):
+            candidate = _Candidate(
+                cls.__name__,
+                class_signature(cls),
+                functools.partial(_prebuilt, inverter),
+            )
+            yield candidate, inverter.http_client
+
+
 class _DiscoveryHttpClient:
     def __init__(
         self,
-        inverter: Inverter,
+        candidate: _Candidate,
         http_client: InverterHttpClient,
         request: Future,
     ):
-        self._inverter = inverter
-        self._http_client = http_client
+        self.candidate = candidate
+        self.http_client = http_client
         self._request: Future = request
+        self._response: Optional[PreparsedResponse] = None
+        self._stage = "queued"
+        self._elapsed: Optional[float] = None
+        self._received: Optional[int] = None
 
     def __str__(self):
-        return str(self._http_client)
+        return str(self.http_client)
 
     async def request(self):
-        request = await self._request
-        request.add_done_callback(self._restore_http_client)
-        return await request
+        if self._response is None:
+            self._response = await self._signed_response()
+        return self._response
 
-    def _restore_http_client(self, _: _InverterTask):
-        self._inverter.http_client = self._http_client
-
-
-async def _discovery_task(i) -> Inverter:
-    logging.info("Trying inverter %s", i)
-    await i.get_data()
+    async def _signed_response(self) -> PreparsedResponse:
+        request = await self._request
+        self._stage = "request"
+        started = time.monotonic()
+        try:
+            response = await request
+        finally:
+            self._elapsed = time.monotonic() - started
+        self._received = len(response.raw)
+        self._stage = "preparse"
+        value = response.value()
+        # the classes whose type and length do not fit give up before parsing
+        self._stage = "signature"
+        name = self.candidate.name
+        if not signature_matches(self.candidate.signature, value):
+            raise Invalid(f"Response does not match the signature of {name}")
+        self._stage = "parse"
+        return response
+
+    def probe_record(self, error: Optional[BaseException] = None) -> ProbeRecord:
+        record = ProbeRecord(
+            inverter=self.candidate.name,
+            variant=str(self.http_client),
+            stage="done" if error is None else self._stage,
+            elapsed=self._elapsed,
+            received=self._received,
+        )
+        if error is None:
+            return record
+        if isinstance(error, asyncio.CancelledError):
+            return record._replace(error="cancelled")
+
+        record = record._replace(error=str(error) or type(error).__name__)
+        cause: Optional[BaseException] = error
+        while cause is not None:
+            status = getattr(cause, "status", None)
+            if isinstance(status, int):
+                record = record._replace(status=status)
+            if isinstance(cause, Invalid):
+                # the message of solax.response_parser, when it validated
+                error_message = getattr(cause, "humanized", str(cause))
+                return record._replace(error=error_message, path=tuple(cause.path))
+            cause = cause.__cause__
+        return record
+
+
+async def _shared_request(http_client: InverterHttpClient) -> PreparsedResponse:
+    # every inverter class tried with this request pre-parses it only once
+    return PreparsedResponse(await http_client.request())
+
+
+async def _discovery_task(
+    http_client: _DiscoveryHttpClient, report: Callable[[ProbeRecord], None]
+) -> Inverter:
+    logging.info("Trying inverter %s::%s", http_client.candidate.name, http_client)
+    try:
+        if http_client.candidate.lazy:
+            # the class is only imported once the response fits it
+            await http_client.request()
+        i = http_client.candidate.build(cast(InverterHttpClient, http_client))
+        try:
+            await i.get_data()
+        finally:
+            i.http_client = http_client.http_client
+    except BaseException as ex:
+        report(http_client.probe_record(ex))
+        raise
+    report(http_client.probe_record())
     return i
 
 
-async def discover(
-    host, port, pwd="", **kwargs: Unpack[DiscoveryKeywords]
-) -> Union[Inverter, Set[Inverter]]:
-    done: Set[_InverterTask] = set()
+async def discover_iter(
+    host, port, pwd="", **kwargs: Unpack[DiscoveryIterKeywords]
+) -> AsyncGenerator[Inverter, None]:
+    """
+    Yield each inverter found at host:port as soon as its data validates,
+    without waiting for the other variants to fail or time out. Stop
+    iterating, and close the iterator, to stop discovering; `timeout` bounds
+    the whole discovery in seconds. DiscoveryError is raised when no
+    inverter was found, with the ProbeRecord of every variant tried,
+    which are also passed to `on_probe` as soon as they are known.
+    """
+    # pylint: disable=too-many-locals
     pending: Set[_InverterTask] = set()
     failures = set()
+    probes: List[ProbeRecord] = []
+    on_probe = kwargs.get("on_probe")
+
+    def report(record: ProbeRecord) -> None:
+        probes.append(record)
+        if on_probe is not None:
+            on_probe(record)
+
+    await _load_probe_stats()
     requests: Dict[InverterHttpClient, Future] = defaultdict(
         asyncio.get_running_loop().create_future
     )
-
-    return_when = kwargs.get("return_when", asyncio.FIRST_COMPLETED)
-    for cls in kwargs.get("inverters", REGISTRY):
-        for inverter in cls.build_all_variants(host, port, pwd):
-            inverter.http_client = cast(
-                InverterHttpClient,
-                _DiscoveryHttpClient(
-                    inverter, inverter.http_client, requests[inverter.http_client]
-                ),
-            )
-
-            pending.add(
-                asyncio.create_task(_discovery_task(inverter), name=f"{inverter}")
+    # number of classes probed by each request
+    usage: "Counter[InverterHttpClient]" = Counter()
+
+    for candidate, http_client in _candidates(host, port, pwd, kwargs.get("inverters")):
+        if "transport" in kwargs:
+            http_client = http_client.with_transport(kwargs["transport"])
+        if "session" in kwargs:
+            http_client = http_client.with_session(kwargs["session"])
+        usage[http_client] += 1
+        probe = _DiscoveryHttpClient(candidate, http_client, requests[http_client])
+        pending.add(
+            asyncio.create_task(
+                _discovery_task(probe, report),
+                name=f"{candidate.name}::{http_client}",
             )
+        )
 
     if not pending:
-        raise DiscoveryError("No inverters to try to discover")
+        raise DiscoveryError("No inverters to try to discover", probes=probes)
 
-    def cancel(pending: Set[_InverterTask]) -> Set[_InverterTask]:
+    def cancel(pending: Set[Task]) -> Set[Task]:
         for task in pending:
             task.cancel()
         return pending
 
-    def remove_failures_from(done: Set[_InverterTask]) -> None:
-        for task in set(done):
-            exc = task.exception()
-            if exc:
-                failures.add(exc)
-                done.remove(task)
+    def rank(http_client: InverterHttpClient) -> Tuple[int, int]:
+        return PROBE_SUCCESSES[probe_key(http_client)], usage[http_client]
 
-    # stagger HTTP request to prevent accidental Denial Of Service
+    # stagger HTTP request to prevent accidental Denial Of Service,
+    # starting with the requests which succeeded the most, or probe the most
     async def stagger() -> None:
-        for http_client, future in requests.items():
-            future.set_result(asyncio.create_task(http_client.request()))
+        for http_client in sorted(requests, key=rank, reverse=True):
+            future = requests[http_client]
+            future.set_result(asyncio.create_task(_shared_request(http_client)))
             await asyncio.sleep(1)
 
     staggered = asyncio.create_task(stagger())
+    loop = asyncio.get_running_loop()
+    timeout = kwargs.get("timeout")
+    deadline = None if timeout is None else loop.time() + timeout
+    found = False
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if deadline is None else deadline - loop.time(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                logging.info("Discovery timed out after %s seconds", timeout)
+                break
+
+            for task in done:
+                exc = task.exception()
+                if exc:
+                    failures.add(exc)
+                    continue
+                inverter = task.result()
+                await _count_probe_success(inverter.http_client)
+                # its first poll is served the response it was found with
+                inverter.keep_warm_response()
+                found = True
+                yield inverter
+
+            logging.debug("%d discovery tasks are still running...", len(pending))
+    finally:
+        staggered.cancel()
+        # the requests sent, which no remaining class waits for
+        sent = {future.result() for future in requests.values() if future.done()}
+        await asyncio.gather(
+            staggered, *cancel(pending), *cancel(sent), return_exceptions=True
+        )
+
+    if not found:
+        raise DiscoveryError(
+            "Unable to connect to the inverter at "
+            f"host={host} port={port}, or your inverter is not supported yet.\n"
+            "Please see https://github.com/squishykid/solax/wiki/DiscoveryError\n"
+            f"Failures={str(failures)}",
+            probes=probes,
+        )
 
-    while pending and (not done or return_when != asyncio.FIRST_COMPLETED):
-        try:
-            done, pending = await asyncio.wait(pending, return_when=return_when)
-        except asyncio.CancelledError:
-            staggered.cancel()
-            await asyncio.gather(staggered, *cancel(pending), return_exceptions=True)
-            raise
-
-        remove_failures_from(done)
-
-        if done and return_when == asyncio.FIRST_COMPLETED:
-            break
-
-        logging.debug("%d discovery tasks are still running...", len(pending))
-
-        if pending and return_when != asyncio.FIRST_COMPLETED:
-            pending.update(done)
-            done.clear()
-
-    remove_failures_from(done)
-    staggered.cancel()
-    await asyncio.gather(staggered, *cancel(pending), return_exceptions=True)
-
-    if done:
-        logging.info("Discovered inverters: %s", {task.result() for task in done})
-        if return_when == asyncio.FIRST_COMPLETED:
-            return await next(iter(done))
-
-        return {task.result() for task in done}
 
-    raise DiscoveryError(
-        "Unable to connect to the inverter at "
-        f"host={host} port={port}, or your inverter is not supported yet.\n"
-        "Please see https://github.com/squishykid/solax/wiki/DiscoveryError\n"
-        f"Failures={str(failures)}"
+async def discover(
+    host, port, pwd="", **kwargs: Unpack[DiscoveryKeywords]
+) -> Union[Inverter, Set[Inverter]]:
+    """
+    Discover the first inverter found at host:port, or all of them with
+    `return_when=ALL_COMPLETED`. With `keep_session`, the first inverter
+    owns the aiohttp session discovery connected with, and keeps using its
+    connection: close it with `async with` or `Inverter.close`.
+    """
+    return_when = kwargs.get("return_when", asyncio.FIRST_COMPLETED)
+    options = cast(
+        DiscoveryIterKeywords,
+        {
+            key: value
+            for key, value in kwargs.items()
+            if key not in ("keep_session", "return_when")
+        },
     )
+    session = None
+    if kwargs.get("keep_session") and options.get("transport", "aiohttp") == "aiohttp":
+        if return_when != asyncio.FIRST_COMPLETED or "session" in options:
+            raise ValueError("keep_session needs FIRST_COMPLETED and no session")
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        session = options["session"] = aiohttp.ClientSession()
+    discovered: Set[Inverter] = set()
+
+    inverters = discover_iter(host, port, pwd, **options)
+    try:
+        async for inverter in inverters:
+            if return_when == asyncio.FIRST_COMPLETED:
+                logging.info("Discovered inverter: %s", inverter)
+                if session is not None:
+                    inverter.own_session(session)
+                    session = None
+                return inverter
+            discovered.add(inverter)
+    finally:
+        await inverters.aclose()
+        if session is not None:
+            await session.close()
+
+    logging.info("Discovered inverters: %s", discovered)
+    return discovered
 
 
 class DiscoveryError(Exception):
     """Raised when unable to discover inverter"""
+
+    def __init__(self, *args, probes: Iterable[ProbeRecord] = ()):
+        super().__init__(*args)
+        self.probes: Tuple[ProbeRecord, ...] = tuple(probes)
@@ -0,0 +1,182 @@
+"""Export decoded responses to columnar files"""
+
+import csv
+import json
+import os
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from solax.inverter import Inverter, InverterResponse
+from solax.units import Measurement
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None  # type: ignore[assignment]
+
+__all__ = ("ColumnarExporter", "export")
+
+TIMESTAMP_COLUMN = "timestamp"
+
+_FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".csv": "csv",
+}
+
+
+def _unit_metadata(measurement: Measurement) -> Dict[str, str]:
+    return {
+        "unit": measurement.unit.value,
+        "is_monotonic": str(measurement.is_monotonic).lower(),
+        "resets_daily": str(measurement.resets_daily).lower(),
+        "storage": str(measurement.storage).lower(),
+    }
+
+
+class ColumnarExporter:
+    # pylint: disable=too-many-instance-attributes
+    """
+    Write decoded responses to a columnar file, one column per sensor.
+
+    Rows are buffered and written `chunk_size` at a time, so memory stays
+    bounded however long the history is. Parquet and Arrow files need
+    `pyarrow` and carry the unit of every sensor in the field metadata.
+    CSV files are written with the standard library, and their units go
+    to a `<path>.units.json` file next to them.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        sensors: Dict[str, Tuple[int, Measurement]],
+        file_format: Optional[str] = None,
+        chunk_size: int = 4096,
+    ):
+        if file_format is None:
+            _, suffix = os.path.splitext(os.fspath(path))
+            file_format = _FORMATS.get(suffix.lower(), "csv")
+        if file_format not in ("parquet", "arrow", "csv"):
+            raise ValueError(f"Unknown file format {file_format!r}")
+        if file_format != "csv" and pyarrow is None:  # pragma: no cover
+            raise ValueError(f"{file_format} export requires the pyarrow package")
+
+        self.path = path
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.sensors = dict(sensors)
+        self.rows = 0
+        self._names = [TIMESTAMP_COLUMN, *self.sensors]
+        self._columns: List[List[Any]] = [[] for _ in self._names]
+        self._writer: Any = None
+        self._schema: Any = None
+        self._file: Any = None
+
+    @classmethod
+    def for_inverter(
+        cls,
+        inverter: Union[Type[Inverter], Inverter],
+        path: Union[str, os.PathLike],
+        **kwargs,
+    ):
+        return cls(path, inverter.sensor_map(), **kwargs)
+
+    def write(self, timestamp: float, response: InverterResponse) -> None:
+        data = response.data
+        columns = self._columns
+        columns[0].append(timestamp)
+        for column, name in zip(columns[1:], self._names[1:]):
+            column.append(data.get(name))
+        if len(columns[0]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._columns[0] and self._writer is not None:
+            return
+        if self.file_format == "csv":
+            self._flush_csv()
+        else:
+            self._flush_arrow()
+        self.rows += len(self._columns[0])
+        for column in self._columns:
+            column.clear()
+
+    def _flush_csv(self) -> None:
+        if self._file is None:
+            # pylint: disable-next=consider-using-with
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self._names)
+            units = {
+                name: _unit_metadata(measurement)
+                for name, (_, measurement) in self.sensors.items()
+            }
+            units_path = f"{os.fspath(self.path)}.units.json"
+            with open(units_path, "w", encoding="utf-8") as units_file:
+                json.dump(units, units_file, indent=2)
+        self._writer.writerows(zip(*self._columns))
+
+    def _arrow_schema(self):
+        fields = [pyarrow.field(TIMESTAMP_COLUMN, pyarrow.float64())]
+        for name, column in zip(self._names[1:], self._columns[1:]):
+            sample = next((value for value in column if value is not None), 0.0)
+            kind = pyarrow.string() if isinstance(sample, str) else pyarrow.float64()
+            metadata = _unit_metadata(self.sensors[name][1])
+            fields.append(pyarrow.field(name, kind, metadata=metadata))
+        return pyarrow.schema(fields)
+
+    def _flush_arrow(self) -> None:
+        if self._writer is None:
+            self._schema = self._arrow_schema()
+            if self.file_format == "parquet":
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pyarrow.ipc.new_file(self.path, self._schema)
+        table = pyarrow.Table.from_arrays(
+            [
+                pyarrow.array(column, type=field.type)
+                for column, field in zip(self._columns, self._schema)
+            ],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None and self.file_format != "csv":
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def export(
+    rows: Iterable[Tuple[float, InverterResponse]],
+    inverter: Union[Type[Inverter], Inverter],
+    path: Union[str, os.PathLike],
+    **kwargs,
+) -> int:
+    """
+    Export (timestamp, response) pairs, e.g. from `solax.recorder.replay`,
+    and return the number of rows written.
+    """
+    with ColumnarExporter.for_inverter(inverter, path, **kwargs) as exporter:
+        for timestamp, response in rows:
+            exporter.write(timestamp, response)
+    return exporter.rows
@@ -0,0 +1,384 @@
+"""Poll large fleets of inverters from several worker processes"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+import multiprocessing
+import os
+import struct
+import time
+from array import array
+from multiprocessing.connection import Connection, wait
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    cast,
+)
+
+import aiohttp
+
+from solax.discovery import discover
+from solax.history import as_float
+from solax.inverter import Inverter
+
+__all__ = ("FleetResult", "FleetRunner", "Target", "shard_for")
+
+_LOGGER = logging.getLogger(__name__)
+
+# target id, timestamp, error flag, number of values (or of error message bytes)
+_FRAME_HEADER = struct.Struct("<IdBI")
+_OK = 0
+_ERROR = 1
+
+
+class Target(NamedTuple):
+    """An inverter to poll, with the class it is known to be"""
+
+    host: str
+    port: int
+    inverter: Type[Inverter]
+    pwd: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+class FleetResult(NamedTuple):
+    """
+    Outcome of polling one target. Sensors are in `sensor_map()` order and
+    the ones which do not decode to a number are reported as NaN.
+    """
+
+    target: Target
+    timestamp: float
+    data: Optional[Dict[str, float]]
+    error: Optional[str]
+
+
+def shard_for(key: str, shards: int) -> int:
+    """
+    Rendezvous hashing: adding or removing a shard only moves
+    the targets which belonged to, or now belong to, that shard.
+    """
+
+    def weight(shard: int) -> bytes:
+        return hashlib.blake2b(f"{shard}:{key}".encode(), digest_size=8).digest()
+
+    return max(range(shards), key=weight)
+
+
+def encode_values(target_id: int, timestamp: float, values: Sequence[float]) -> bytes:
+    header = _FRAME_HEADER.pack(target_id, timestamp, _OK, len(values))
+    return header + array("d", values).tobytes()
+
+
+def encode_error(target_id: int, timestamp: float, message: str) -> bytes:
+    encoded = message.encode("utf-8")
+    return _FRAME_HEADER.pack(target_id, timestamp, _ERROR, len(encoded)) + encoded
+
+
+def decode_frames(
+    buffer: bytes,
+) -> Iterator[Tuple[int, float, Optional[array], Optional[str]]]:
+    """Yield (target id, timestamp, values, error) for each encoded frame"""
+    view = memoryview(buffer)
+    offset = 0
+    while offset < len(view):
+        target_id, timestamp, status, count = _FRAME_HEADER.unpack_from(view, offset)
+        start = offset + _FRAME_HEADER.size
+        if status == _OK:
+            values = array("d")
+            offset = start + count * values.itemsize
+            values.frombytes(view[start:offset])
+            yield target_id, timestamp, values, None
+        else:
+            offset = start + count
+            yield target_id, timestamp, None, bytes(view[start:offset]).decode("utf-8")
+
+
+async def _poll(
+    target_id: int,
+    target: Target,
+    inverters: Dict[int, Inverter],
+    session: aiohttp.ClientSession,
+) -> bytes:
+    try:
+        inverter = inverters.get(target_id)
+        if inverter is None:
+            found = await discover(
+                target.host,
+                target.port,
+                target.pwd,
+                inverters=[target.inverter],
+                session=session,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            inverter = inverters[target_id] = cast(Inverter, found)
+        response = await inverter.get_data()
+    except Exception as ex:  # pylint: disable=broad-except
+        return encode_error(target_id, time.time(), f"{type(ex).__name__}: {ex}")
+
+    data = response.data
+    values = [as_float(data.get(name)) for name in inverter.sensor_map()]
+    return encode_values(target_id, time.time(), values)
+
+
+async def _send_frames(conn: Connection, frames: "asyncio.Queue[bytes]") -> None:
+    """
+    Send the frames from a thread, so that a parent slow to read does not
+    block the loop, joining the ones queued meanwhile
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await frames.get()]
+        while not frames.empty():
+            batch.append(frames.get_nowait())
+        await loop.run_in_executor(None, conn.send_bytes, b"".join(batch))
+
+
+async def _serve(conn: Connection, targets: Dict[int, Target], interval: float):
+    # pylint: disable=too-many-locals
+    inverters: Dict[int, Inverter] = {}
+    # the polls still running, which are not started again until they end
+    polling: Dict[int, "asyncio.Task[bytes]"] = {}
+    frames: "asyncio.Queue[bytes]" = asyncio.Queue()
+
+    def polled(target_id: int, task: "asyncio.Task[bytes]") -> None:
+        if polling.get(target_id) is task:
+            del polling[target_id]
+        if not task.cancelled():
+            frames.put_nowait(task.result())
+
+    async with aiohttp.ClientSession() as session:
+        sender = asyncio.create_task(_send_frames(conn, frames))
+        try:
+            while True:
+                while conn.poll():
+                    message = conn.recv()
+                    if message is None:
+                        return
+                    targets = message
+                    inverters = {i: v for i, v in inverters.items() if i in targets}
+                    for target_id in set(polling) - set(targets):
+                        polling.pop(target_id).cancel()
+
+                started = time.monotonic()
+                # each frame is sent as soon as its poll ends, so that slow
+                # targets do not hold back the others
+                for target_id, target in targets.items():
+                    if target_id not in polling:
+                        task = asyncio.create_task(
+                            _poll(target_id, target, inverters, session)
+                        )
+                        polling[target_id] = task
+                        task.add_done_callback(functools.partial(polled, target_id))
+
+                deadline = started + interval
+                while time.monotonic() < deadline and not conn.poll():
+                    await asyncio.sleep(min(deadline - time.monotonic(), 0.1))
+        finally:
+            sender.cancel()
+            for running in polling.values():
+                running.cancel()
+
+
+def _worker_main(conn: Connection, targets: Dict[int, Target], interval: float):
+    try:
+        asyncio.run(_serve(conn, targets, interval))
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):  # pragma: no cover
+        pass
+
+
+class _Worker:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, process, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.targets: Dict[int, Target] = {}
+
+
+class FleetRunner:
+    # pylint: disable=too-many-instance-attributes
+    """
+    Poll a fleet of inverters from `workers` processes.
+
+    Every target is assigned to a worker by hashing its host and port, and
+    each worker runs its own event loop with a pooled HTTP session. Workers
+    stream back compact binary frames of float arrays rather than pickled
+    dictionaries. Dead workers are restarted with their targets, and adding
+    or removing targets only touches the workers whose share changed, as
+    `resize` only moves the targets of the workers started or stopped.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[Target] = (),
+        workers: Optional[int] = None,
+        interval: float = 10.0,
+        context: Any = None,
+    ):
+        self.interval = interval
+        self.restarts = 0
+        self._context = context or multiprocessing.get_context("spawn")
+        self._workers: List[Optional[_Worker]] = [None] * (
+            workers or os.cpu_count() or 1
+        )
+        self._targets: Dict[int, Target] = {}
+        self._ids: Dict[Target, int] = {}
+        self._next_id = 0
+        self._sensors: Dict[Type[Inverter], List[str]] = {}
+        for target in targets:
+            self.add(target)
+
+    def _assignment(self, shard: int) -> Dict[int, Target]:
+        return {
+            target_id: target
+            for target_id, target in self._targets.items()
+            if shard_for(target.key, len(self._workers)) == shard
+        }
+
+    def _spawn(self, shard: int) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        targets = self._assignment(shard)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, targets, self.interval),
+            name=f"solax-fleet-{shard}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        worker.targets = targets
+        self._workers[shard] = worker
+
+    def _rebalance(self, shard: int) -> None:
+        worker = self._workers[shard]
+        if worker is None:
+            return
+        targets = self._assignment(shard)
+        try:
+            worker.conn.send(targets)
+            worker.targets = targets
+        except (BrokenPipeError, OSError):
+            self._restart(shard, worker)
+
+    def _restart(self, shard: int, worker: _Worker) -> None:
+        _LOGGER.warning("Restarting fleet worker %d", shard)
+        worker.conn.close()
+        worker.process.join(0)
+        self.restarts += 1
+        self._spawn(shard)
+
+    def start(self) -> None:
+        for shard, worker in enumerate(self._workers):
+            if worker is None:
+                self._spawn(shard)
+
+    def resize(self, workers: int) -> None:
+        """
+        Poll from `workers` processes, starting or stopping the workers
+        needed, and hand the targets over to the workers they now hash to
+        """
+        if workers < 1:
+            raise ValueError("A fleet needs at least one worker")
+        started = any(self._workers)
+        for shard in range(workers, len(self._workers)):
+            self._stop(shard)
+        del self._workers[workers:]
+        self._workers.extend([None] * (workers - len(self._workers)))
+        for shard, worker in enumerate(self._workers):
+            if worker is not None:
+                self._rebalance(shard)
+            elif started:
+                self._spawn(shard)
+
+    def add(self, target: Target) -> None:
+        if target in self._ids:
+            return
+        self._ids[target] = self._next_id
+        self._targets[self._next_id] = target
+        self._next_id += 1
+        self._sensors.setdefault(target.inverter, list(target.inverter.sensor_map()))
+        self._rebalance(shard_for(target.key, len(self._workers)))
+
+    def remove(self, target: Target) -> None:
+        """Stop polling `target`, which is ignored when it is not polled"""
+        target_id = self._ids.pop(target, None)
+        if target_id is None:
+            return
+        del self._targets[target_id]
+        self._rebalance(shard_for(target.key, len(self._workers)))
+
+    def poll(self, timeout: Optional[float] = None) -> List[FleetResult]:
+        """
+        Wait up to `timeout` for results and return the available ones,
+        restarting any worker found dead on the way.
+        """
+        workers = {w.conn: shard for shard, w in enumerate(self._workers) if w}
+        sentinels = {
+            w.process.sentinel: shard for shard, w in enumerate(self._workers) if w
+        }
+        results: List[FleetResult] = []
+        for ready in wait([*workers, *sentinels], timeout):
+            if ready in workers:
+                try:
+                    buffer = ready.recv_bytes()  # type: ignore[union-attr]
+                except (EOFError, OSError):
+                    continue
+                results.extend(self._decode(buffer))
+        for shard in sentinels.values():
+            worker = self._workers[shard]
+            if worker is not None and not worker.process.is_alive():
+                self._restart(shard, worker)
+        return results
+
+    def results(self) -> Iterator[FleetResult]:
+        """Yield results forever, as they come"""
+        while True:
+            yield from self.poll()
+
+    def _decode(self, buffer: bytes) -> Iterator[FleetResult]:
+        for target_id, timestamp, values, error in decode_frames(buffer):
+            target = self._targets.get(target_id)
+            if target is None:
+                continue  # removed while being polled
+            data = None
+            if values is not None:
+                data = dict(zip(self._sensors[target.inverter], values))
+            yield FleetResult(target, timestamp, data, error)
+
+    def _stop(self, shard: int) -> None:
+        worker = self._workers[shard]
+        if worker is None:
+            return
+        try:
+            worker.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        worker.process.join(self.interval + 1)
+        if worker.process.is_alive():  # pragma: no cover
+            worker.process.terminate()
+            worker.process.join()
+        worker.conn.close()
+        self._workers[shard] = None
+
+    def stop(self) -> None:
+        for shard in range(len(self._workers)):
+            self._stop(shard)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
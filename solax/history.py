@@ -0,0 +1,190 @@
+"""Fixed capacity, columnar history of inverter responses"""
+
+import math
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from solax.inverter import Inverter, InverterResponse
+from solax.units import Measurement, Units
+
+__all__ = ("History",)
+
+_NAN = float("nan")
+_SECONDS_PER_HOUR = 3600.0
+
+
+def as_float(value) -> float:
+    """The value as a float, NaN when it is not a number"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _NAN
+
+
+class History:
+    """
+    Ring buffer holding the last `capacity` responses of an inverter.
+
+    Every sensor of the inverter `sensor_map()` is stored in its own
+    preallocated float column, next to a column of monotonic timestamps.
+    Appending is O(1) and reading returns memoryviews over the columns,
+    so no value is copied unless the caller asks for it. Sensors which
+    do not decode to a number (e.g. run mode texts) are stored as NaN.
+    """
+
+    def __init__(self, sensors: Dict[str, Tuple[int, Measurement]], capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be a positive number")
+        self.capacity = capacity
+        self.sensors = dict(sensors)
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._columns: Dict[str, array] = {
+            name: array("d", bytes(8 * capacity)) for name in self.sensors
+        }
+        self._start = 0
+        self._size = 0
+
+    @classmethod
+    def for_inverter(cls, inverter: Union[Type[Inverter], Inverter], capacity: int):
+        """Build a history matching the sensors of the given inverter"""
+        return cls(inverter.sensor_map(), capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, response: InverterResponse, timestamp: Optional[float] = None):
+        """
+        Record a response, overwriting the oldest one once full.
+        Timestamps default to `time.monotonic()` and must never decrease.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self._size and timestamp < self._timestamps[self._physical(-1)]:
+            raise ValueError("timestamps must be monotonic")
+
+        if self._size < self.capacity:
+            position = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            position = self._start
+            self._start = (self._start + 1) % self.capacity
+
+        self._timestamps[position] = timestamp
+        data = response.data
+        for name, column in self._columns.items():
+            column[position] = as_float(data.get(name))
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def _physical(self, logical: int) -> int:
+        if logical < 0:
+            logical += self._size
+        return (self._start + logical) % self.capacity
+
+    def _segments(self, column: array, start: int, stop: int) -> Tuple[memoryview, ...]:
+        """Views over the logical range [start, stop), oldest first"""
+        if start >= stop:
+            return ()
+        view = memoryview(column)
+        first = self._physical(start)
+        last = first + (stop - start)
+        if last <= self.capacity:
+            return (view[first:last],)
+        return (view[first:], view[: last - self.capacity])
+
+    def _window(self, seconds: Optional[float]) -> int:
+        """Logical index of the first sample within the trailing window"""
+        if seconds is None or not self._size:
+            return 0
+        newest = self._timestamps[self._physical(-1)]
+        return bisect_left(_LogicalView(self), newest - seconds)
+
+    def timestamps(self, last: Optional[int] = None) -> Tuple[memoryview, ...]:
+        """Views over the timestamps, oldest first, of the `last` samples"""
+        return self._segments(self._timestamps, self._first(last), self._size)
+
+    def column(self, sensor: str, last: Optional[int] = None) -> Tuple[memoryview, ...]:
+        """
+        Views over the values, oldest first, of the `last` samples of a sensor.
+        The views are split in two when the requested range wraps around.
+        """
+        return self._segments(self._columns[sensor], self._first(last), self._size)
+
+    def _first(self, last: Optional[int]) -> int:
+        if last is None:
+            return 0
+        return max(self._size - last, 0)
+
+    def last(self, sensor: str, count: int = 1) -> List[float]:
+        """Copy of the `count` most recent values of a sensor"""
+        values: List[float] = []
+        for segment in self.column(sensor, count):
+            values.extend(segment)
+        return values
+
+    def _values(self, sensor: str, seconds: Optional[float]) -> Iterator[float]:
+        column = self._columns[sensor]
+        for segment in self._segments(column, self._window(seconds), self._size):
+            for value in segment:
+                if not math.isnan(value):
+                    yield value
+
+    def min(self, sensor: str, seconds: Optional[float] = None) -> Optional[float]:
+        """Smallest value over the trailing window (or whole history)"""
+        return min(self._values(sensor, seconds), default=None)
+
+    def max(self, sensor: str, seconds: Optional[float] = None) -> Optional[float]:
+        """Largest value over the trailing window (or whole history)"""
+        return max(self._values(sensor, seconds), default=None)
+
+    def mean(self, sensor: str, seconds: Optional[float] = None) -> Optional[float]:
+        """Average value over the trailing window (or whole history)"""
+        total = 0.0
+        count = 0
+        for value in self._values(sensor, seconds):
+            total += value
+            count += 1
+        return total / count if count else None
+
+    def energy(self, sensor: str, seconds: Optional[float] = None) -> float:
+        """
+        Integrate a power sensor (`Units.W`) over the trailing window
+        using the trapezoidal rule. The result is expressed in kWh.
+        """
+        unit = self.sensors[sensor][1].unit
+        if unit is not Units.W:
+            raise ValueError(f"{sensor} is measured in {unit.value!r}, not in W")
+
+        watt_seconds = 0.0
+        previous: Optional[Tuple[float, float]] = None
+        start = self._window(seconds)
+        times = self._segments(self._timestamps, start, self._size)
+        values = self._segments(self._columns[sensor], start, self._size)
+        for time_segment, value_segment in zip(times, values):
+            for timestamp, value in zip(time_segment, value_segment):
+                if math.isnan(value):
+                    previous = None
+                    continue
+                if previous is not None:
+                    elapsed = timestamp - previous[0]
+                    watt_seconds += (value + previous[1]) / 2 * elapsed
+                previous = (timestamp, value)
+        return watt_seconds / _SECONDS_PER_HOUR / 1000
+
+
+class _LogicalView:
+    # pylint: disable=too-few-public-methods
+    """Sequence protocol over the timestamps, in logical order, for bisect"""
+
+    def __init__(self, history: History):
+        self._history = history
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def __getitem__(self, index: int) -> float:
+        # pylint: disable=protected-access
+        return self._history._timestamps[self._history._physical(index)]
@@ -1,22 +1,108 @@
+import asyncio
+import functools
+import time
+import warnings
 from abc import abstractmethod
-from typing import Any, Dict, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Optional,
+    Tuple,
+    cast,
+)
 
-import aiohttp
-import voluptuous as vol
-
-from solax import utils
-from solax.inverter_http_client import InverterHttpClient, Method
-from solax.response_parser import InverterResponse, ResponseDecoder, ResponseParser
+from solax import codegen, utils
+from solax.inverter_http_client import InverterHttpClient, Method, request_errors
+from solax.response_parser import (
+    DecoderLayout,
+    InverterResponse,
+    ResponseDecoder,
+    ResponseParser,
+    select_sensors,
+    validation_errors,
+)
 from solax.units import Measurement, Units
 
+if TYPE_CHECKING:  # pragma: no cover
+    import voluptuous as vol
+
+    from solax.parse_executor import ParseExecutor
+
 
 class InverterError(Exception):
     """Indicates error communicating with inverter"""
 
 
+# decoder layouts, per inverter class
+_LAYOUTS: Dict[type, DecoderLayout] = {}
+# generated decode functions, per inverter class, float conversion
+# and selected sensors
+_DecoderKey = Tuple[type, bool, Optional[FrozenSet[str]]]
+_DECODERS: Dict[_DecoderKey, codegen.DecodeFunction] = {}
+# validation schemas, per inverter class
+_SCHEMAS: Dict[type, "vol.Schema"] = {}
+
+
+def _min_length(validator) -> Optional[int]:
+    """The shortest length a validator accepts, when it checks one"""
+    import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+    if isinstance(validator, vol.Schema) and not isinstance(validator.schema, dict):
+        return _min_length(validator.schema)
+    if isinstance(validator, vol.Length):
+        return cast(Optional[int], validator.min)
+    if isinstance(validator, (vol.All, vol.Any)):
+        lengths = [_min_length(v) for v in validator.validators]
+        known = [length for length in lengths if length is not None]
+        if isinstance(validator, vol.All):
+            # every validator applies, so the strictest one wins
+            return max(known) if known else None
+        if known and len(known) == len(lengths):
+            return min(known)
+    return None
+
+
+class _sensors_method(classmethod):
+    """
+    A classmethod taking `sensors`, which default to the `sensors`
+    of the instance when it is called on one
+    """
+
+    # pylint: disable=invalid-name,too-few-public-methods
+
+    def __get__(
+        self, instance, owner=None
+    ) -> Callable[..., Dict[str, Tuple[int, Measurement]]]:
+        method = super().__get__(instance, owner)
+        if instance is None:
+            return method
+
+        @functools.wraps(self.__func__)
+        def bound(sensors: Optional[Iterable[str]] = None):
+            return method(instance.sensors if sensors is None else sensors)
+
+        return bound
+
+
+# the per-instance overrides of class attributes which `with_sensors` keeps
+_OVERRIDES = (
+    "generate_decoder",
+    "on_payload",
+    "parse_executor",
+    "response_ttl",
+    "warm_response_ttl",
+)
+
+
 class Inverter:
     """Base wrapper around Inverter HTTP API"""
 
+    # pylint: disable=too-many-instance-attributes
+
     @classmethod
     def response_decoder(cls) -> ResponseDecoder:
         """
@@ -26,23 +112,186 @@ class Inverter:
         raise NotImplementedError()
 
     # pylint: enable=C0301
-    _schema = vol.Schema({})  # type: vol.Schema
+    # a schema built beforehand, instead of by `build_schema`
+    _schema: Optional["vol.Schema"] = None
+
+    # when set, responses are parsed by this executor instead of on the loop
+    parse_executor: Optional["ParseExecutor"] = None
 
-    def __init__(self, http_client: InverterHttpClient):
+    # seconds during which the last response is served without a new request
+    response_ttl: float = 0.0
+
+    # seconds during which the response of discovery serves the first poll
+    warm_response_ttl: float = 10.0
+
+    # when set, responses are mapped by code generated from the decoder
+    generate_decoder: bool = False
+
+    # called with each payload received and whether it was validated
+    on_payload: Optional[Callable[[bytes, bool], None]] = None
+
+    # the only sensors decoded by an instance, all of them when None
+    sensors: Optional[FrozenSet[str]] = None
+
+    def __init__(
+        self,
+        http_client: InverterHttpClient,
+        trusted: bool = False,
+        sensors: Optional[Iterable[str]] = None,
+    ):
         self.manufacturer = "Solax"
         self.http_client = http_client
+        if sensors is not None:
+            self.sensors = frozenset(sensors)
+        self.response_parser = type(self).build_response_parser(trusted, self.sensors)
+        self._in_flight: Optional[asyncio.Future] = None
+        self._waiters = 0
+        self._last_response: Optional[Tuple[float, InverterResponse]] = None
+        # the response served to the next get_data, see `keep_warm_response`
+        self._warm_response: Optional[Tuple[float, InverterResponse]] = None
+        # the aiohttp session the instance closes, see `own_session`
+        self._session: Any = None
+
+    async def __aenter__(self) -> "Inverter":
+        """
+        Send the requests through a session of the instance, closed on exit
+        with the other connections to the inverter
+        """
+        http_client = self.http_client
+        aiohttp_client = getattr(http_client, "transport", None) == "aiohttp"
+        if aiohttp_client and getattr(http_client, "session", False) is None:
+            import aiohttp  # pylint: disable=import-outside-toplevel
+
+            self.own_session(aiohttp.ClientSession())
+        return self
 
-        schema = type(self).schema()
-        response_decoder = type(self).response_decoder()
-        dongle_serial_number_getter = type(self).dongle_serial_number_getter
-        inverter_serial_number_getter = type(self).inverter_serial_number_getter
-        self.response_parser = ResponseParser(
-            schema,
-            response_decoder,
-            dongle_serial_number_getter,
-            inverter_serial_number_getter,
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    def own_session(self, session) -> None:
+        """Send the requests through `session`, which `close` closes"""
+        self.http_client = self.http_client.with_session(session)
+        self._session = session
+
+    async def close(self) -> None:
+        """Cancel the pending request and close the connections"""
+        if self._in_flight is not None:
+            self._in_flight.cancel()
+            self._in_flight = None
+        session, self._session = self._session, None
+        if session is not None:
+            self.http_client = self.http_client.with_session(None)
+            await session.close()
+        self.http_client.close_connections()
+
+    def __del__(self) -> None:
+        session = getattr(self, "_session", None)
+        if session is not None and not session.closed:
+            warnings.warn(
+                f"Unclosed session of {self}, use `async with` or close()",
+                ResourceWarning,
+                source=self,
+            )
+
+    def with_sensors(self, sensors: Iterable[str]) -> "Inverter":
+        """
+        An instance of the same class and client decoding only `sensors`,
+        which takes over the session and the warm response of the instance
+        """
+        # pylint: disable=protected-access
+        inverter = type(self)(self.http_client, self.response_parser.trusted, sensors)
+        for name in _OVERRIDES:
+            if name in vars(self):
+                setattr(inverter, name, vars(self)[name])
+        inverter._session, self._session = self._session, None
+        if self._warm_response is not None and inverter.sensors is not None:
+            received, response = self._warm_response
+            if inverter.sensors <= response.data.keys():
+                data = {
+                    name: value
+                    for name, value in response.data.items()
+                    if name in inverter.sensors
+                }
+                inverter._warm_response = (received, response._replace(data=data))
+        return inverter
+
+    def keep_warm_response(self) -> None:
+        """
+        Serve the last response, such as the one discovery validated,
+        to the next `get_data` if it comes within `warm_response_ttl`
+        """
+        self._warm_response = self._last_response
+
+    @classmethod
+    def build_response_parser(
+        cls, trusted: bool = False, sensors: Optional[Iterable[str]] = None
+    ) -> ResponseParser:
+        """
+        Return a parser for the responses of this inverter,
+        without needing an http client. Trusted parsers skip
+        the validation of the responses, and parsers given
+        `sensors` only decode these sensors.
+        """
+        if sensors is not None:
+            sensors = frozenset(sensors)
+        return ResponseParser(
+            cls.schema(),
+            cls.response_decoder(),
+            cls.dongle_serial_number_getter,
+            cls.inverter_serial_number_getter,
+            trusted=trusted,
+            layout=cls.decoder_layout() if sensors is None else None,
+            decode=(
+                cls.generated_decoder(trusted, sensors)
+                if cls.generate_decoder
+                else None
+            ),
+            sensors=sensors,
         )
 
+    @classmethod
+    def generated_decoder(
+        cls, convert: bool = False, sensors: Optional[FrozenSet[str]] = None
+    ) -> codegen.DecodeFunction:
+        """
+        Return the decode function generated for this inverter, or for
+        some of its sensors, compiled once per class
+        """
+        decode = _DECODERS.get((cls, convert, sensors))
+        if decode is None:
+            decode = _DECODERS[(cls, convert, sensors)] = codegen.generate_decoder(
+                select_sensors(cls.response_decoder(), sensors),
+                convert,
+                f"decode_{cls.__name__}",
+            )
+        return decode
+
+    @classmethod
+    def decoder_layout(cls) -> DecoderLayout:
+        """
+        Return the indexes read by the decoder of this inverter,
+        computed once per class
+        """
+        layout = _LAYOUTS.get(cls)
+        if layout is None:
+            layout = _LAYOUTS[cls] = DecoderLayout.of(cls.response_decoder())
+        return layout
+
+    @classmethod
+    def check_decoder(cls) -> None:
+        """
+        Raise ValueError if the schema accepts data
+        too short for the indexes read by the decoder
+        """
+        required = cls.decoder_layout().required_length
+        for key, validator in cls.schema().schema.items():
+            accepted = _min_length(validator) if str(key) == "data" else None
+            if accepted is not None and accepted < required:
+                raise ValueError(
+                    f"{cls.__name__} accepts {accepted} data values "
+                    f"but its decoder reads {required}"
+                )
+
     @classmethod
     def _build(cls, host, port, pwd="", params_in_query=True):
         url = utils.to_url(host, port)
@@ -63,12 +312,55 @@ class Inverter:
         return versions
 
     async def get_data(self) -> InverterResponse:
+        """
+        Concurrent callers share a single request and its result, and the
+        last response is reused for `response_ttl` seconds when it is set.
+        """
+        warm_response, self._warm_response = self._warm_response, None
+        if warm_response is not None:
+            received, response = warm_response
+            if time.monotonic() - received < self.warm_response_ttl:
+                return response
+
+        if self.response_ttl > 0 and self._last_response is not None:
+            received, response = self._last_response
+            if time.monotonic() - received < self.response_ttl:
+                return response
+
+        in_flight = self._in_flight
+        if in_flight is None:
+            in_flight = self._in_flight = asyncio.ensure_future(self._fetch())
+            in_flight.add_done_callback(self._fetched)
+        elif in_flight.get_loop() is not asyncio.get_running_loop():
+            # requests are only shared within an event loop
+            return await self._fetch()
+
+        self._waiters += 1
+        try:
+            return await asyncio.shield(in_flight)
+        except asyncio.CancelledError:
+            if self._waiters == 1:
+                in_flight.cancel()
+                # the next caller must not join the request being cancelled
+                if self._in_flight is in_flight:
+                    self._in_flight = None
+            raise
+        finally:
+            self._waiters -= 1
+
+    def _fetched(self, in_flight: asyncio.Future) -> None:
+        if self._in_flight is in_flight:
+            self._in_flight = None
+        if not in_flight.cancelled() and in_flight.exception() is None:
+            self._last_response = (time.monotonic(), in_flight.result())
+
+    async def _fetch(self) -> InverterResponse:
         try:
             data = await self.make_request()
-        except aiohttp.ClientError as ex:
+        except request_errors() as ex:
             msg = "Could not connect to inverter endpoint"
             raise InverterError(msg, str(self.__class__.__name__)) from ex
-        except vol.Invalid as ex:
+        except validation_errors() as ex:
             msg = "Received malformed JSON from inverter"
             raise InverterError(msg, str(self.__class__.__name__)) from ex
         return data
@@ -79,16 +371,30 @@ class Inverter:
         Raise exception if unable to get data
         """
         raw_response = await self.http_client.request()
-        return self.response_parser.handle_response(raw_response)
+        try:
+            if self.parse_executor is not None:
+                response = await self.parse_executor.parse(self, raw_response)
+            else:
+                response = self.response_parser.handle_response(raw_response)
+        except Exception:
+            if self.on_payload is not None:
+                self.on_payload(raw_response, False)
+            raise
+        if self.on_payload is not None:
+            self.on_payload(raw_response, not self.response_parser.trusted)
+        return response
 
-    @classmethod
-    def sensor_map(cls) -> Dict[str, Tuple[int, Measurement]]:
+    @_sensors_method  # type: ignore[arg-type]
+    def sensor_map(
+        cls, sensors: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[int, Measurement]]:
         """
-        Return sensor map
+        Return sensor map, of all the sensors or only of `sensors`,
+        which default to the `sensors` an instance decodes
         Warning, HA depends on this
         """
-        sensors: Dict[str, Tuple[int, Measurement]] = {}
-        for name, mapping in cls.response_decoder().items():
+        sensor_map: Dict[str, Tuple[int, Measurement]] = {}
+        for name, mapping in select_sensors(cls.response_decoder(), sensors).items():
             unit = Measurement(Units.NONE)
 
             (idx, unit_or_measurement, *_) = mapping
@@ -101,15 +407,38 @@ class Inverter:
                 sensor_indexes = idx[0]
                 first_sensor_index = sensor_indexes[0]
                 idx = first_sensor_index
-            sensors[name] = (idx, unit)
-        return sensors
+            sensor_map[name] = (idx, unit)
+        return sensor_map
+
+    @classmethod
+    def build_schema(cls) -> "vol.Schema":
+        """
+        Inverter implementations should override
+        this to return the schema of their responses
+        """
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        return vol.Schema({})
 
     @classmethod
-    def schema(cls) -> vol.Schema:
+    def schema(cls) -> "vol.Schema":
         """
-        Return schema
+        Return schema, built on first use so that the metadata of the
+        inverters is available without voluptuous
         """
-        return cls._schema
+        schema = _SCHEMAS.get(cls)
+        if schema is None:
+            # the closest of a `_schema` and a `build_schema` is used
+            attributes = next(
+                attributes
+                for attributes in map(vars, cls.__mro__)
+                if attributes.get("_schema") is not None or "build_schema" in attributes
+            )
+            schema = attributes.get("_schema")
+            if schema is None:
+                schema = cls.build_schema()
+            _SCHEMAS[cls] = schema
+        return schema
 
     @classmethod
     def dongle_serial_number_getter(cls, response: Dict[str, Any]) -> Optional[str]:
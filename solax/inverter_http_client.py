@@ -2,21 +2,43 @@ from __future__ import annotations
 
 import dataclasses
 import sys
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type
+from urllib.parse import urlsplit
 from weakref import WeakValueDictionary
 
-import aiohttp
+from solax import rate_limit, raw_http
 
-__all__ = ("InverterHttpClient", "Method")
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+
+__all__ = ("InverterHttpClient", "Method", "TRANSPORTS", "request_errors")
 
 if sys.version_info >= (3, 10):
     from dataclasses import KW_ONLY
 
 
 REQUEST_TIMEOUT = 5.0
-_CACHE: WeakValueDictionary[int, InverterHttpClient] = WeakValueDictionary()
+_CACHE: WeakValueDictionary[Tuple[Any, ...], InverterHttpClient] = WeakValueDictionary()
+
+# the sessions opened by `async with` on a client, in the current task
+_OWNED_SESSIONS: ContextVar[
+    Tuple[Tuple[InverterHttpClient, aiohttp.ClientSession], ...]
+] = ContextVar("_OWNED_SESSIONS", default=())
+
+# "aiohttp" is the default, "raw" is the lighter solax.raw_http client
+TRANSPORTS = ("aiohttp", "raw")
+
+
+def request_errors() -> Tuple[Type[Exception], ...]:
+    """The errors of failed requests, of every transport"""
+    # aiohttp is only imported when requests are made
+    import aiohttp  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    return (aiohttp.ClientError, raw_http.TransportError)
 
 
 class Method(Enum):
@@ -33,6 +55,7 @@ if sys.version_info >= (3, 11):
 
 @dataclass(frozen=True, **_kwargs)
 class InverterHttpClient:
+    # pylint: disable=too-many-instance-attributes
     """Initialize the Http client."""
 
     if sys.version_info >= (3, 10):
@@ -42,41 +65,82 @@ class InverterHttpClient:
     method: Method
     pwd: str
     headers: Dict[str, str] = field(default_factory=dict)
-    data: Optional[bytes] = None
+    data: Optional[str] = None
     query: str = ""
+    session: Optional[aiohttp.ClientSession] = None
+    transport: str = "aiohttp"
+
+    # derived from the fields above once, as the client is frozen
+    _url: str = field(init=False, repr=False, compare=False)
+    _body: Optional[bytes] = field(init=False, repr=False, compare=False)
+    _headers: Dict[str, str] = field(init=False, repr=False, compare=False)
+    _address: Tuple[str, int] = field(init=False, repr=False, compare=False)
+    _raw_request: bytes = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        url = self.url + "?" + self.query if self.query else self.url
+        body = self.data.encode("utf-8") if self.data else None
+        split_url = urlsplit(url)
+        object.__setattr__(self, "_url", url)
+        object.__setattr__(self, "_body", body)
+        object.__setattr__(self, "_headers", dict(self.headers))
+        object.__setattr__(
+            self, "_address", (split_url.hostname or "", split_url.port or 80)
+        )
+
+        target = split_url.path or "/"
+        if split_url.query:
+            target += "?" + split_url.query
+        lines = [
+            f"{self.method.name} {target} HTTP/1.1",
+            f"Host: {split_url.netloc}",
+            "Accept: */*",
+            "Connection: keep-alive",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        if self.method is Method.POST:
+            lines.append("Content-Type: application/octet-stream")
+            lines.append(f"Content-Length: {len(body or b'')}")
+        head = "\r\n".join(lines) + "\r\n\r\n"
+        object.__setattr__(self, "_raw_request", head.encode("latin-1") + (body or b""))
 
     def __hash__(self):
         return id(self)
 
     def replace(self, **kwargs) -> InverterHttpClient:
-        fields = dataclasses.fields(InverterHttpClient)
-        data = {}
-        values = []
-
-        for fld in fields:
-            if fld.name in kwargs:
-                value = kwargs.pop(fld.name)
-            else:
-                value = getattr(self, fld.name)
-
-            data[fld.name] = value
-
-            if isinstance(value, dict):
-                value = dict(value)
-                values.append(tuple(value.items()))
-            else:
-                values.append(value)
-
-            data[fld.name] = value
-
-        key = hash(tuple(values))
+        """
+        Return the client with the given fields replaced. Clients are
+        cached on the value of all their fields, so equal clients are
+        the same instance and share a single discovery request.
+        """
+        values = {name: getattr(self, name) for name in _FIELDS}
+        values.update(kwargs)
+        values["headers"] = dict(values["headers"])
+
+        key = tuple(
+            tuple(sorted(value.items())) if isinstance(value, dict) else value
+            for value in values.values()
+        )
         cached = _CACHE.get(key)
 
         if cached is None:
-            cached = _CACHE[key] = InverterHttpClient(**data)
+            cached = _CACHE[key] = InverterHttpClient(**values)
 
         return cached
 
+    def with_session(self, session) -> InverterHttpClient:
+        """
+        Send the requests through a long lived session, and so reuse
+        its pooled connections, instead of one session per request.
+        The caller remains in charge of closing the session.
+        """
+        return self.replace(session=session)
+
+    def with_transport(self, transport) -> InverterHttpClient:
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}")
+        return self.replace(transport=transport)
+
     def with_headers(self, headers) -> InverterHttpClient:
         return self.replace(headers=dict(headers))
 
@@ -101,32 +165,88 @@ class InverterHttpClient:
 
         return self.with_query(query)
 
+    async def __aenter__(self) -> InverterHttpClient:
+        """
+        Return the client bound to a session of its own, closed on exit,
+        when it has no session and uses aiohttp, else the client itself
+        """
+        if self.session is not None or self.transport != "aiohttp":
+            return self
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        session = aiohttp.ClientSession()
+        _OWNED_SESSIONS.set(_OWNED_SESSIONS.get() + ((self, session),))
+        return self.with_session(session)
+
+    async def __aexit__(self, *_) -> None:
+        owned = list(_OWNED_SESSIONS.get())
+        for position in reversed(range(len(owned))):
+            if owned[position][0] is self:
+                session = owned.pop(position)[1]
+                _OWNED_SESSIONS.set(tuple(owned))
+                await session.close()
+                break
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the kept alive connections to the inverter. A session given
+        with `with_session` is left to the caller, who closes it.
+        """
+        self.close_connections()
+
+    def close_connections(self) -> None:
+        """Close the connections the raw transport keeps to the inverter"""
+        raw_http.close(*self._address)
+
     async def request(self):
+        limiter = rate_limit.limiter_for(*self._address)
+        if limiter is not None:
+            await limiter.acquire()
+        if self.transport == "raw":
+            return await self.raw()
         if self.method is Method.POST:
             return await self.post()
         return await self.get()
 
+    @asynccontextmanager
+    async def _session(self):
+        if self.session is not None:
+            yield self.session
+        else:
+            import aiohttp  # pylint: disable=import-outside-toplevel
+
+            async with aiohttp.ClientSession() as session:
+                yield session
+
     async def get(self):
-        url = self.url + "?" + self.query if self.query else self.url
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.get(
-                url, headers=self.headers, timeout=REQUEST_TIMEOUT
+                self._url, headers=self._headers, timeout=REQUEST_TIMEOUT
             ) as req:
                 req.raise_for_status()
                 resp = await req.read()
         return resp
 
     async def post(self):
-        url = self.url + "?" + self.query if self.query else self.url
-        data = self.data.encode("utf-8") if self.data else None
-        async with aiohttp.ClientSession() as session:
+        async with self._session() as session:
             async with session.post(
-                url, headers=self.headers, data=data, timeout=REQUEST_TIMEOUT
+                self._url,
+                headers=self._headers,
+                data=self._body,
+                timeout=REQUEST_TIMEOUT,
             ) as req:
                 req.raise_for_status()
                 resp = await req.read()
         return resp
 
+    async def raw(self):
+        host, port = self._address
+        return await raw_http.request(host, port, self._raw_request, REQUEST_TIMEOUT)
+
     def __str__(self) -> str:
         using = "query in url" if self.query else "data in the body"
         return f"{self.url} using {using}"
+
+
+_FIELDS = tuple(fld.name for fld in dataclasses.fields(InverterHttpClient) if fld.init)
@@ -1,19 +1,44 @@
-from .qvolt_hyb_g3_3p import QVOLTHYBG33P
-from .x1 import X1
-from .x1_boost import X1Boost
-from .x1_g4_series import X1G4Series
-from .x1_hybrid_gen4 import X1HybridGen4
-from .x1_lite_lv import X1LiteLV
-from .x1_mini import X1Mini
-from .x1_mini_v34 import X1MiniV34
-from .x1_smart import X1Smart
-from .x3 import X3
-from .x3_evc import X3EVC
-from .x3_hybrid_g4 import X3HybridG4
-from .x3_mic_pro_g2 import X3MicProG2
-from .x3_ultra import X3Ultra
-from .x3_v34 import X3V34
-from .x_hybrid import XHybrid
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .qvolt_hyb_g3_3p import QVOLTHYBG33P
+    from .x1 import X1
+    from .x1_boost import X1Boost
+    from .x1_g4_series import X1G4Series
+    from .x1_hybrid_gen4 import X1HybridGen4
+    from .x1_lite_lv import X1LiteLV
+    from .x1_mini import X1Mini
+    from .x1_mini_v34 import X1MiniV34
+    from .x1_smart import X1Smart
+    from .x3 import X3
+    from .x3_evc import X3EVC
+    from .x3_hybrid_g4 import X3HybridG4
+    from .x3_mic_pro_g2 import X3MicProG2
+    from .x3_ultra import X3Ultra
+    from .x3_v34 import X3V34
+    from .x_hybrid import XHybrid
+
+# each inverter module is imported on first use, so that discovery only
+# imports the classes whose signature fits a response
+_MODULES = {
+    "QVOLTHYBG33P": "qvolt_hyb_g3_3p",
+    "X1": "x1",
+    "X1Boost": "x1_boost",
+    "X1G4Series": "x1_g4_series",
+    "X1HybridGen4": "x1_hybrid_gen4",
+    "X1LiteLV": "x1_lite_lv",
+    "X1Mini": "x1_mini",
+    "X1MiniV34": "x1_mini_v34",
+    "X1Smart": "x1_smart",
+    "X3": "x3",
+    "X3EVC": "x3_evc",
+    "X3HybridG4": "x3_hybrid_g4",
+    "X3MicProG2": "x3_mic_pro_g2",
+    "X3Ultra": "x3_ultra",
+    "X3V34": "x3_v34",
+    "XHybrid": "x_hybrid",
+}
 
 __all__ = [
     "QVOLTHYBG33P",
@@ -33,3 +58,12 @@ __all__ = [
     "X3Ultra",
     "X3EVC",
 ]
+
+
+def __getattr__(name: str):
+    try:
+        module = importlib.import_module(f".{_MODULES[name]}", __name__)
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    cls = globals()[name] = getattr(module, name)
+    return cls
@@ -1,7 +1,5 @@
 from typing import Any, Dict, Optional
 
-import voluptuous as vol
-
 from solax.inverter import Inverter, InverterHttpClient
 from solax.units import DailyTotal, Measurement, Total, Units
 from solax.utils import div10, div100, pack_u16, to_signed, twoway_div10, twoway_div100
@@ -47,23 +45,27 @@ class QVOLTHYBG33P(Inverter):
         super().__init__(http_client, *args, **kwargs)
         self.manufacturer = "Qcells"
 
-    _schema = vol.Schema(
-        {
-            vol.Required("type"): vol.All(int, 14),
-            vol.Required("sn"): str,
-            vol.Required("ver"): str,
-            vol.Required("data"): vol.Schema(
-                vol.All(
-                    [vol.Coerce(float)],
-                    vol.Length(min=200, max=200),
-                )
-            ),
-            vol.Required("information"): vol.Schema(
-                vol.All(vol.Length(min=10, max=10))
-            ),
-        },
-        extra=vol.REMOVE_EXTRA,
-    )
+    @classmethod
+    def build_schema(cls):
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        return vol.Schema(
+            {
+                vol.Required("type"): vol.All(int, 14),
+                vol.Required("sn"): str,
+                vol.Required("ver"): str,
+                vol.Required("data"): vol.Schema(
+                    vol.All(
+                        [vol.Coerce(float)],
+                        vol.Length(min=200, max=200),
+                    )
+                ),
+                vol.Required("information"): vol.Schema(
+                    vol.All(vol.Length(min=10, max=10))
+                ),
+            },
+            extra=vol.REMOVE_EXTRA,
+        )
 
     @classmethod
     def response_decoder(cls):
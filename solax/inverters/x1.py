@@ -1,7 +1,5 @@
 from typing import Any, Dict, Optional
 
-import voluptuous as vol
-
 from solax.inverter import Inverter
 from solax.units import DailyTotal, Total, Units
 from solax.utils import startswith
@@ -9,25 +7,31 @@ from solax.utils import startswith
 
 class X1(Inverter):
     # pylint: disable=duplicate-code
-    _schema = vol.Schema(
-        {
-            vol.Required("type"): vol.All(str, startswith("X1-")),
-            vol.Required("sn"): str,
-            vol.Required("ver"): str,
-            vol.Required("data"): vol.Schema(
-                vol.All(
-                    [vol.Coerce(float)],
-                    vol.Any(
-                        vol.Length(min=102, max=102),
-                        vol.Length(min=103, max=103),
-                        vol.Length(min=107, max=107),
-                    ),
-                )
-            ),
-            vol.Required("information"): vol.Schema(vol.All(vol.Length(min=9, max=9))),
-        },
-        extra=vol.REMOVE_EXTRA,
-    )
+    @classmethod
+    def build_schema(cls):
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        return vol.Schema(
+            {
+                vol.Required("type"): vol.All(str, startswith("X1-")),
+                vol.Required("sn"): str,
+                vol.Required("ver"): str,
+                vol.Required("data"): vol.Schema(
+                    vol.All(
+                        [vol.Coerce(float)],
+                        vol.Any(
+                            vol.Length(min=102, max=102),
+                            vol.Length(min=103, max=103),
+                            vol.Length(min=107, max=107),
+                        ),
+                    )
+                ),
+                vol.Required("information"): vol.Schema(
+                    vol.All(vol.Length(min=9, max=9))
+                ),
+            },
+            extra=vol.REMOVE_EXTRA,
+        )
 
     @classmethod
     def response_decoder(cls):
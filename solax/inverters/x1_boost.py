@@ -1,7 +1,5 @@
 from typing import Any, Dict, Optional
 
-import voluptuous as vol
-
 from solax.inverter import Inverter
 from solax.units import DailyTotal, Total, Units
 from solax.utils import div10, div100, pack_u16, to_signed
@@ -14,28 +12,32 @@ class X1Boost(Inverter):
     """
 
     # pylint: disable=duplicate-code
-    _schema = vol.Schema(
-        {
-            vol.Required("type", "type"): vol.All(int, 4),
-            vol.Required(
-                "sn",
-            ): str,
-            vol.Required("ver"): str,
-            vol.Required("data"): vol.Schema(
-                vol.All(
-                    [vol.Coerce(float)],
-                    vol.Any(
-                        vol.Length(min=100, max=100),
-                        vol.Length(min=200, max=200),
-                    ),
-                )
-            ),
-            vol.Required("information"): vol.Schema(
-                vol.All(vol.Length(min=10, max=10))
-            ),
-        },
-        extra=vol.REMOVE_EXTRA,
-    )
+    @classmethod
+    def build_schema(cls):
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        return vol.Schema(
+            {
+                vol.Required("type", "type"): vol.All(int, 4),
+                vol.Required(
+                    "sn",
+                ): str,
+                vol.Required("ver"): str,
+                vol.Required("data"): vol.Schema(
+                    vol.All(
+                        [vol.Coerce(float)],
+                        vol.Any(
+                            vol.Length(min=100, max=100),
+                            vol.Length(min=200, max=200),
+                        ),
+                    )
+                ),
+                vol.Required("information"): vol.Schema(
+                    vol.All(vol.Length(min=10, max=10))
+                ),
+            },
+            extra=vol.REMOVE_EXTRA,
+        )
 
     @classmethod
     def response_decoder(cls):
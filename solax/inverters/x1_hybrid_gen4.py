@@ -1,7 +1,5 @@
 from typing import Any, Dict, Optional
 
-import voluptuous as vol
-
 from solax.inverter import Inverter
 from solax.units import DailyTotal, Total, Units
 from solax.utils import div10, div100, pack_u16, to_signed
@@ -9,23 +7,29 @@ from solax.utils import div10, div100, pack_u16, to_signed
 
 class X1HybridGen4(Inverter):
     # pylint: disable=duplicate-code
-    _schema = vol.Schema(
-        {
-            vol.Required("type"): vol.All(int, 15),
-            vol.Required(
-                "sn",
-            ): str,
-            vol.Required("ver"): str,
-            vol.Required("data"): vol.Schema(
-                vol.All(
-                    [vol.Coerce(float)],
-                    vol.Length(min=200, max=300),
-                )
-            ),
-            vol.Required("information"): vol.Schema(vol.All(vol.Length(min=9, max=10))),
-        },
-        extra=vol.REMOVE_EXTRA,
-    )
+    @classmethod
+    def build_schema(cls):
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        return vol.Schema(
+            {
+                vol.Required("type"): vol.All(int, 15),
+                vol.Required(
+                    "sn",
+                ): str,
+                vol.Required("ver"): str,
+                vol.Required("data"): vol.Schema(
+                    vol.All(
+                        [vol.Coerce(float)],
+                        vol.Length(min=200, max=300),
+                    )
+                ),
+                vol.Required("information"): vol.Schema(
+                    vol.All(vol.Length(min=9, max=10))
+                ),
+            },
+            extra=vol.REMOVE_EXTRA,
+        )
 
     @classmethod
     def build_all_variants(cls, host, port, pwd=""):
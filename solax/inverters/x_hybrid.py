@@ -1,7 +1,5 @@
 from typing import Any, Dict, Optional
 
-import voluptuous as vol
-
 from solax.inverter import Inverter, InverterHttpClient, Method
 from solax.units import DailyTotal, Total, Units
 
@@ -12,22 +10,26 @@ class XHybrid(Inverter):
     * SK-TL5000E
     """
 
-    _schema = vol.Schema(
-        {
-            vol.Required("method"): str,
-            vol.Required("version"): str,
-            vol.Required("type"): str,
-            vol.Required("sn"): str,
-            vol.Required("data"): vol.Schema(
-                vol.All(
-                    [vol.Coerce(float)],
-                    vol.Any(vol.Length(min=58, max=58), vol.Length(min=68, max=68)),
-                )
-            ),
-            vol.Required("status"): vol.All(vol.Coerce(int), vol.Range(min=0)),
-        },
-        extra=vol.REMOVE_EXTRA,
-    )
+    @classmethod
+    def build_schema(cls):
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        return vol.Schema(
+            {
+                vol.Required("method"): str,
+                vol.Required("version"): str,
+                vol.Required("type"): str,
+                vol.Required("sn"): str,
+                vol.Required("data"): vol.Schema(
+                    vol.All(
+                        [vol.Coerce(float)],
+                        vol.Any(vol.Length(min=58, max=58), vol.Length(min=68, max=68)),
+                    )
+                ),
+                vol.Required("status"): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            },
+            extra=vol.REMOVE_EXTRA,
+        )
 
     @classmethod
     def _build(cls, host, port, pwd="", params_in_query=True):
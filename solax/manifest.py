@@ -0,0 +1,274 @@
+"""
+Static description of the registered inverters, so that tools and discovery
+can know their probes, signatures and sensors without importing them.
+Discovery builds the probes of the shipped inverters from it, and only
+imports the classes whose signature fits a response.
+
+Regenerate the shipped manifest with `python -m solax.manifest -o
+solax/manifest.json`, and check it is up to date with `--check`.
+"""
+
+import argparse
+import json
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, cast
+from urllib.parse import urlsplit
+
+import voluptuous as vol
+
+from solax.inverter import Inverter
+from solax.inverter_http_client import InverterHttpClient, Method
+from solax.units import Measurement
+
+__all__ = (
+    "MANIFEST_PATH",
+    "build_manifest",
+    "build_probe",
+    "class_signature",
+    "describe",
+    "entry_signature",
+    "load_manifest",
+    "main",
+    "matches_signature",
+    "signature_matches",
+)
+
+MANIFEST_PATH = Path(__file__).with_name("manifest.json")
+MANIFEST_VERSION = 2
+# the password the `pwd_probes` are described with, replaced by the actual one
+PWD_PLACEHOLDER = "{pwd}"
+
+# the `type` signature and the accepted [min, max] `data` lengths of a class
+Signature = Tuple[Dict[str, Any], Optional[List[List[Optional[int]]]]]
+
+
+def _flatten(validator) -> Iterable[Any]:
+    if isinstance(validator, vol.Schema) and not isinstance(validator.schema, dict):
+        yield from _flatten(validator.schema)
+    elif isinstance(validator, vol.All):
+        for inner in validator.validators:
+            yield from _flatten(inner)
+    else:
+        yield validator
+
+
+def _type_signature(validator) -> Dict[str, Any]:
+    """The kind, values and prefix the `type` validator accepts, when known"""
+    signature: Dict[str, Any] = {}
+    for inner in _flatten(validator):
+        if inner in (int, str):
+            signature["kind"] = inner.__name__
+        elif isinstance(inner, (int, str)):
+            signature.setdefault("values", []).append(inner)
+        elif isinstance(getattr(inner, "prefix", None), str):
+            signature["prefix"] = inner.prefix
+        else:
+            # a validator which is not modelled, such as vol.Coerce, may
+            # convert the value the validators after it see
+            break
+    return signature
+
+
+def _data_lengths(validator) -> Optional[List[List[Optional[int]]]]:
+    """The [min, max] lengths the `data` validator accepts, None if any"""
+    lengths: List[List[Optional[int]]] = []
+    for inner in _flatten(validator):
+        if isinstance(inner, vol.Length):
+            lengths.append(
+                [cast(Optional[int], inner.min), cast(Optional[int], inner.max)]
+            )
+        elif isinstance(inner, vol.Any):
+            alternatives = [_data_lengths(alt) for alt in inner.validators]
+            if None in alternatives:
+                # an alternative accepting any length
+                return None
+            for alternative in alternatives:
+                lengths.extend(cast(List[List[Optional[int]]], alternative))
+    return lengths or None
+
+
+def _probe(inverter: Inverter) -> Dict[str, Any]:
+    http_client = inverter.http_client
+    return {
+        "method": http_client.method.name,
+        "path": urlsplit(http_client.url).path,
+        "pwd": http_client.pwd,
+        "query": http_client.query,
+        "data": http_client.data,
+        "headers": dict(http_client.headers),
+    }
+
+
+def _sensor(idx: int, measurement: Measurement) -> Dict[str, Any]:
+    sensor: Dict[str, Any] = {"index": idx, "unit": measurement.unit.value}
+    # only the flags which are set, read as attributes since Total and
+    # DailyTotal override them at class level
+    sensor.update(
+        (flag, True) for flag in measurement._fields[1:] if getattr(measurement, flag)
+    )
+    return sensor
+
+
+def describe(cls: Type[Inverter]) -> Dict[str, Any]:
+    """
+    The manifest entry of an inverter class. Its probes are the requests
+    of `build_all_variants` without password, and its `pwd_probes` those
+    with `PWD_PLACEHOLDER` as password. Raise ValueError when the schema
+    accepts data too short for the decoder.
+    """
+    cls.check_decoder()
+    schema = {str(key): value for key, value in cls.schema().schema.items()}
+    return {
+        "class": f"{cls.__module__}:{cls.__qualname__}",
+        "type": _type_signature(schema.get("type")),
+        "data_lengths": _data_lengths(schema.get("data")),
+        "required_length": cls.decoder_layout().required_length,
+        "probes": sorted(
+            (_probe(inverter) for inverter in cls.build_all_variants("localhost", 80)),
+            key=json.dumps,
+        ),
+        "pwd_probes": sorted(
+            (
+                _probe(inverter)
+                for inverter in cls.build_all_variants("localhost", 80, PWD_PLACEHOLDER)
+            ),
+            key=json.dumps,
+        ),
+        "sensors": {
+            name: _sensor(idx, measurement)
+            for name, (idx, measurement) in cls.sensor_map().items()
+        },
+    }
+
+
+def build_manifest(inverters: Iterable[Type[Inverter]]) -> Dict[str, Any]:
+    return {
+        "version": MANIFEST_VERSION,
+        "inverters": {
+            cls.__name__: describe(cls)
+            for cls in sorted(inverters, key=lambda cls: cls.__name__)
+        },
+    }
+
+
+def dumps(manifest: Dict[str, Any]) -> str:
+    return json.dumps(manifest, indent=2, ensure_ascii=False) + "\n"
+
+
+@lru_cache(maxsize=None)
+def load_manifest(path: Optional[Path] = None) -> Dict[str, Any]:
+    """Load the shipped manifest, or the one at `path`, once"""
+    with open(path or MANIFEST_PATH, encoding="utf-8") as manifest:
+        return json.load(manifest)
+
+
+def build_probe(probe: Dict[str, Any], host, port, pwd="") -> InverterHttpClient:
+    """
+    The client sending a probe of the manifest to host:port, with `pwd`
+    when the probe is one of the `pwd_probes`
+    """
+
+    def fill(value):
+        return value.replace(PWD_PLACEHOLDER, pwd) if isinstance(value, str) else value
+
+    return InverterHttpClient(
+        url=f"http://{host}:{port}{probe['path']}",
+        method=Method[probe["method"]],
+        pwd=fill(probe["pwd"]),
+        headers=dict(probe["headers"]),
+        data=fill(probe["data"]),
+        query=fill(probe["query"]),
+    ).replace()
+
+
+def entry_signature(entry: Dict[str, Any]) -> Signature:
+    return entry["type"], entry["data_lengths"]
+
+
+# type signature and data lengths, per inverter class
+_SIGNATURES: Dict[type, Signature] = {}
+
+
+def class_signature(cls: Type[Inverter]) -> Signature:
+    """The signature of a class, read from the manifest when it is shipped"""
+    signature = _SIGNATURES.get(cls)
+    if signature is None:
+        entry = load_manifest()["inverters"].get(cls.__name__)
+        if entry is None or entry["class"] != f"{cls.__module__}:{cls.__qualname__}":
+            # not a shipped class, or a subclass of one
+            schema = {str(key): value for key, value in cls.schema().schema.items()}
+            entry = {
+                "type": _type_signature(schema.get("type")),
+                "data_lengths": _data_lengths(schema.get("data")),
+            }
+        signature = _SIGNATURES[cls] = entry_signature(entry)
+    return signature
+
+
+def matches_signature(cls: Type[Inverter], response: Dict[str, Any]) -> bool:
+    """
+    Tell whether the `type` and the length of the `data` of a pre-parsed
+    response fit the signature of a class, which its schema requires
+    """
+    return signature_matches(class_signature(cls), response)
+
+
+def signature_matches(signature: Signature, response: Dict[str, Any]) -> bool:
+    """Like `matches_signature`, for a signature of the manifest"""
+    type_signature, lengths = signature
+    value = response.get("type")
+    kind = {"int": int, "str": str}.get(type_signature.get("kind", ""), object)
+    if not isinstance(value, kind):
+        return False
+    if "values" in type_signature and value not in type_signature["values"]:
+        return False
+    prefix = type_signature.get("prefix")
+    if prefix is not None and not str(value).startswith(prefix):
+        return False
+
+    if lengths is None:
+        return True
+    data = response.get("data")
+    return isinstance(data, list) and any(
+        (low is None or len(data) >= low) and (high is None or len(data) <= high)
+        for low, high in lengths
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from solax.discovery import REGISTRY
+
+    parser = argparse.ArgumentParser(
+        prog="python -m solax.manifest",
+        description="Write the manifest of the registered inverters",
+    )
+    parser.add_argument("-o", "--output", type=Path, help="file to write")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with 1 when the shipped manifest is out of date",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        generated = dumps(build_manifest(REGISTRY))
+    except ValueError as ex:
+        print(f"Inconsistent inverter {ex}", file=sys.stderr)
+        return 1
+    if args.check:
+        if MANIFEST_PATH.read_text(encoding="utf-8") != generated:
+            print(f"{MANIFEST_PATH} is out of date", file=sys.stderr)
+            return 1
+        return 0
+    if args.output:
+        args.output.write_text(generated, encoding="utf-8")
+    else:
+        sys.stdout.write(generated)
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""Minimal Modbus TCP client, reading the `data` array from registers"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Collection,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    cast,
+)
+from weakref import WeakKeyDictionary
+
+from solax import rate_limit
+from solax.inverter_http_client import REQUEST_TIMEOUT
+from solax.raw_http import TransportError
+from solax.response_parser import DecoderLayout, select_sensors
+
+if TYPE_CHECKING:  # pragma: no cover
+    from solax.inverter import Inverter
+    from solax.inverter_http_client import InverterHttpClient
+
+__all__ = (
+    "MAX_REGISTERS",
+    "MODBUS_PORT",
+    "READ_HOLDING_REGISTERS",
+    "READ_INPUT_REGISTERS",
+    "ModbusClient",
+    "ModbusError",
+    "ModbusSimulator",
+    "plan_reads",
+    "read_registers",
+    "register_windows",
+    "sensor_indexes",
+)
+
+MODBUS_PORT = 502
+READ_HOLDING_REGISTERS = 3
+READ_INPUT_REGISTERS = 4
+# registers per read request, the limit of the Modbus specification
+MAX_REGISTERS = 125
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+
+# transaction id, protocol id, length of the rest of the frame, unit id
+_HEADER = struct.Struct(">HHHB")
+_READ = struct.Struct(">BHH")
+
+
+class ModbusError(TransportError):
+    """Indicates a failed Modbus request, `code` is its exception code"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+def register_windows(
+    indexes: Iterable[int], max_count: int = MAX_REGISTERS, max_gap: int = 0
+) -> List[Tuple[int, int]]:
+    """
+    Coalesce register indexes into the fewest (start, count) windows of
+    registers, of at most `max_count` registers each. Gaps of up to
+    `max_gap` registers which are not needed are read rather than
+    starting another window.
+    """
+    windows: List[Tuple[int, int]] = []
+    for index in sorted(set(indexes)):
+        if windows:
+            start, count = windows[-1]
+            if index - (start + count) <= max_gap and index - start < max_count:
+                windows[-1] = (start, index - start + 1)
+                continue
+        windows.append((index, 1))
+    return windows
+
+
+def sensor_indexes(
+    cls: Type[Inverter], sensors: Optional[Iterable[str]] = None
+) -> FrozenSet[int]:
+    """
+    The indexes of the data array read to decode these sensors of an
+    inverter class, or all its sensors
+    """
+    if sensors is None:
+        return cls.decoder_layout().indexes
+    return DecoderLayout.of(select_sensors(cls.response_decoder(), sensors)).indexes
+
+
+def plan_reads(
+    cls: Type[Inverter],
+    sensors: Optional[Iterable[str]] = None,
+    *,
+    address: int = 0,
+    max_count: int = MAX_REGISTERS,
+    max_gap: int = 0,
+) -> List[Tuple[int, int]]:
+    """
+    The windows of registers to read for these sensors of an inverter
+    class, whose data array starts at the register `address`
+    """
+    indexes = sensor_indexes(cls, sensors)
+    return register_windows((address + i for i in indexes), max_count, max_gap)
+
+
+def _frame(transaction: int, unit: int, pdu: bytes) -> bytes:
+    return _HEADER.pack(transaction, 0, len(pdu) + 1, unit) + pdu
+
+
+def _split_frame(buffer: bytearray) -> Optional[Tuple[int, int, bytes]]:
+    """Remove the first complete frame of the buffer, if any"""
+    if len(buffer) < _HEADER.size:
+        return None
+    transaction, _, length, unit = _HEADER.unpack_from(buffer)
+    start = _HEADER.size
+    end = start - 1 + length
+    if len(buffer) < end:
+        return None
+    pdu = bytes(buffer[start:end])
+    del buffer[:end]
+    return transaction, unit, pdu
+
+
+def _registers(pdu: bytes, function: int, count: int) -> Tuple[int, ...]:
+    if pdu[:1] == bytes([function | 0x80]) and len(pdu) == 2:
+        raise ModbusError(f"Modbus exception {pdu[1]}", pdu[1])
+    if pdu[:2] != bytes([function, 2 * count]) or len(pdu) != 2 + 2 * count:
+        raise ModbusError("Malformed Modbus response")
+    return struct.unpack(f">{count}H", pdu[2:])
+
+
+class _ModbusProtocol(asyncio.Protocol):
+    """A connection on which reads are pipelined, matched by transaction"""
+
+    def __init__(self) -> None:
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed = False
+        self._buffer = bytearray()
+        self._transaction = 0
+        self._waiters: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        frame = _split_frame(self._buffer)
+        while frame is not None:
+            transaction, _, pdu = frame
+            waiter = self._waiters.pop(transaction, None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(pdu)
+            frame = _split_frame(self._buffer)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.closed = True
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_exception(ModbusError(f"Connection lost: {exc}"))
+        self._waiters.clear()
+
+    async def read(
+        self, unit: int, function: int, address: int, count: int
+    ) -> Tuple[int, ...]:
+        assert self.transport is not None
+        self._transaction = (self._transaction + 1) % 0x10000
+        transaction = self._transaction
+        waiter = self._waiters[transaction] = asyncio.get_running_loop().create_future()
+        pdu = _READ.pack(function, address, count)
+        self.transport.write(_frame(transaction, unit, pdu))
+        try:
+            return _registers(await waiter, function, count)
+        finally:
+            self._waiters.pop(transaction, None)
+
+    def close(self) -> None:
+        assert self.transport is not None
+        self.closed = True
+        self.transport.close()
+
+
+class _Connections:
+    def __init__(self) -> None:
+        self._protocols: Dict[Tuple[str, int], _ModbusProtocol] = {}
+        self._lock = asyncio.Lock()
+
+    def close(self, host: str, port: int) -> None:
+        protocol = self._protocols.pop((host, port), None)
+        if protocol is not None:
+            protocol.close()
+
+    async def get(self, host: str, port: int) -> _ModbusProtocol:
+        """The open connection to host:port, opened once for all readers"""
+        async with self._lock:
+            protocol = self._protocols.get((host, port))
+            if protocol is None or protocol.closed:
+                loop = asyncio.get_running_loop()
+                try:
+                    _, protocol = await loop.create_connection(
+                        _ModbusProtocol, host, port
+                    )
+                except OSError as ex:
+                    raise ModbusError(f"Cannot connect to {host}:{port}: {ex}") from ex
+                self._protocols[(host, port)] = protocol
+            return protocol
+
+
+_CONNECTIONS: "WeakKeyDictionary[asyncio.AbstractEventLoop, _Connections]" = (
+    WeakKeyDictionary()
+)
+
+
+async def read_registers(
+    host: str,
+    port: int,
+    windows: Sequence[Tuple[int, int]],
+    *,
+    unit: int = 1,
+    function: int = READ_INPUT_REGISTERS,
+    timeout: float = REQUEST_TIMEOUT,
+) -> Dict[int, int]:
+    """
+    Read the (start, count) windows of registers, pipelined on one kept
+    alive connection per event loop, and return the values by address
+    """
+    # pylint: disable=too-many-arguments
+    loop = asyncio.get_running_loop()
+    connections = _CONNECTIONS.get(loop)
+    if connections is None:
+        connections = _CONNECTIONS[loop] = _Connections()
+    protocol = await asyncio.wait_for(connections.get(host, port), timeout)
+    try:
+        reads = await asyncio.wait_for(
+            asyncio.gather(
+                *(
+                    protocol.read(unit, function, start, count)
+                    for start, count in windows
+                )
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        # a device which stopped answering gets a new connection
+        protocol.close()
+        raise
+    registers: Dict[int, int] = {}
+    for (start, _), values in zip(windows, reads):
+        registers.update(enumerate(values, start))
+    return registers
+
+
+@dataclass(frozen=True)
+class ModbusClient:
+    # pylint: disable=too-many-instance-attributes
+    """
+    Read the `data` array of an inverter from Modbus TCP registers instead
+    of the HTTP endpoint of its dongle, `data[i]` being the register at
+    `address + i`. Only the `indexes` are read, such as the
+    `sensor_indexes` of some sensors, in the windows of `register_windows`,
+    and the other values are 0. `request` returns the response
+    the dongle would, with the other `fields` of its JSON, so that the
+    inverter classes parse and decode it unchanged.
+    """
+
+    host: str
+    length: int
+    fields: Mapping[str, Any] = field(default_factory=dict)
+    port: int = MODBUS_PORT
+    unit: int = 1
+    function: int = READ_INPUT_REGISTERS
+    address: int = 0
+    indexes: Optional[Collection[int]] = None
+    max_count: int = MAX_REGISTERS
+    max_gap: int = 0
+
+    # derived from the fields above once, as the client is frozen
+    _windows: Tuple[Tuple[int, int], ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        indexes = range(self.length) if self.indexes is None else self.indexes
+        windows = register_windows(
+            (self.address + index for index in indexes), self.max_count, self.max_gap
+        )
+        object.__setattr__(self, "_windows", tuple(windows))
+
+    async def request(self) -> bytes:
+        limiter = rate_limit.limiter_for(self.host, self.port)
+        if limiter is not None:
+            await limiter.acquire()
+        registers = await read_registers(
+            self.host,
+            self.port,
+            self._windows,
+            unit=self.unit,
+            function=self.function,
+        )
+        data = [registers.get(self.address + i, 0) for i in range(self.length)]
+        return json.dumps({**self.fields, "Data": data}).encode("utf-8")
+
+    @property
+    def session(self) -> None:
+        """Modbus clients send no HTTP request, and so have no session"""
+        return None
+
+    def with_session(self, _session) -> ModbusClient:
+        """The client itself, so that it can be bound like HTTP clients"""
+        return self
+
+    async def __aenter__(self) -> ModbusClient:
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        self.close_connections()
+
+    def close_connections(self) -> None:
+        """Close the connection kept to the inverter, of the running loop"""
+        connections = _CONNECTIONS.get(asyncio.get_running_loop())
+        if connections is not None:
+            connections.close(self.host, self.port)
+
+    def build_inverter(self, cls: Type[Inverter], trusted: bool = False) -> Inverter:
+        """Return an inverter of this class reading through this client"""
+        return cls(cast("InverterHttpClient", self), trusted)
+
+    def __str__(self) -> str:
+        return f"modbus://{self.host}:{self.port}/{self.unit}"
+
+
+class ModbusSimulator:
+    """
+    Local Modbus TCP server answering reads with the given registers,
+    for tests and development without an inverter. The reads received
+    are kept in `reads`, as (unit, function, address, count).
+    """
+
+    def __init__(
+        self,
+        registers: Sequence[int],
+        functions: Iterable[int] = (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS),
+    ):
+        self.registers = list(registers)
+        self.functions = frozenset(functions)
+        self.reads: List[Tuple[int, int, int, int]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def respond(self, unit: int, pdu: bytes) -> bytes:
+        function = pdu[0]
+        if function not in self.functions or len(pdu) != _READ.size:
+            return bytes([function | 0x80, ILLEGAL_FUNCTION])
+        _, address, count = _READ.unpack(pdu)
+        self.reads.append((unit, function, address, count))
+        if not 0 < count <= MAX_REGISTERS or address + count > len(self.registers):
+            return bytes([function | 0x80, ILLEGAL_DATA_ADDRESS])
+        end = address + count
+        values = self.registers[address:end]
+        return bytes([function, 2 * count]) + struct.pack(f">{count}H", *values)
+
+    async def _handle(self, reader, writer) -> None:
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffer += data
+                frame = _split_frame(buffer)
+                while frame is not None:
+                    transaction, unit, pdu = frame
+                    writer.write(_frame(transaction, unit, self.respond(unit, pdu)))
+                    frame = _split_frame(buffer)
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Start serving, and return the address served"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> Tuple[str, int]:
+        return await self.start()
+
+    async def __aexit__(self, *_) -> None:
+        await self.stop()
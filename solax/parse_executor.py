@@ -0,0 +1,134 @@
+"""Offload response parsing from the event loop to an executor"""
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from weakref import WeakKeyDictionary
+
+from solax.response_parser import InverterResponse, ResponseParser
+
+if TYPE_CHECKING:  # pragma: no cover
+    from solax.inverter import Inverter
+
+__all__ = ("ParseExecutor",)
+
+_ParserKey = Tuple[Type["Inverter"], bool, Optional[FrozenSet[str]]]
+_Job = Tuple[Union[ResponseParser, _ParserKey], bytes]
+
+
+# parsers built by the workers of process pools, per inverter class, trust
+# and selected sensors
+_PARSERS: Dict[_ParserKey, ResponseParser] = {}
+
+
+def _parser_for(key: _ParserKey) -> ResponseParser:
+    parser = _PARSERS.get(key)
+    if parser is None:
+        cls, trusted, sensors = key
+        parser = _PARSERS[key] = cls.build_response_parser(trusted, sensors)
+    return parser
+
+
+def _parse_batch(jobs: List[_Job]) -> List[Tuple[bool, Any]]:
+    results: List[Tuple[bool, Any]] = []
+    for parser, raw in jobs:
+        if not isinstance(parser, ResponseParser):
+            parser = _parser_for(parser)
+        try:
+            results.append((True, parser.handle_response(raw)))
+        except Exception as ex:  # pylint: disable=broad-except
+            results.append((False, ex))
+    return results
+
+
+class _Batch:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, timer: asyncio.TimerHandle) -> None:
+        self.jobs: List[_Job] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer = timer
+
+
+class ParseExecutor:
+    # pylint: disable=too-few-public-methods
+    """
+    Parse inverter responses in a thread or process pool.
+
+    The HTTP requests stay on the event loop, only the JSON decoding,
+    validation and mapping move to the executor. Responses arriving within
+    `max_delay` seconds of each other are handed over as one batch of at
+    most `max_batch`, so that small parses do not pay one handoff each.
+
+    Process pools can not receive parsers, so they get the inverter class
+    instead and build, once per worker process, the parser of that class.
+    """
+
+    def __init__(
+        self, executor: Executor, max_batch: int = 16, max_delay: float = 0.002
+    ):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._by_class = isinstance(executor, ProcessPoolExecutor)
+        self._batches: "WeakKeyDictionary[asyncio.AbstractEventLoop, _Batch]" = (
+            WeakKeyDictionary()
+        )
+
+    async def parse(self, inverter: "Inverter", raw: bytes) -> InverterResponse:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            timer = loop.call_later(self.max_delay, self._flush, loop)
+            batch = self._batches[loop] = _Batch(timer)
+
+        future = loop.create_future()
+        parser: Union[ResponseParser, _ParserKey] = inverter.response_parser
+        if self._by_class:
+            parser = (
+                type(inverter),
+                inverter.response_parser.trusted,
+                inverter.sensors,
+            )
+        batch.jobs.append((parser, raw))
+        batch.futures.append(future)
+        if len(batch.jobs) >= self.max_batch:
+            self._flush(loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        # a full batch is flushed before its timer, which is then cancelled
+        batch = self._batches.pop(loop)
+        batch.timer.cancel()
+
+        def dispatch(done: asyncio.Future) -> None:
+            results: List[Tuple[bool, Any]]
+            if done.cancelled():  # pragma: no cover
+                results = [(False, asyncio.CancelledError())] * len(batch.jobs)
+            elif done.exception() is not None:
+                results = [(False, done.exception())] * len(batch.jobs)
+            else:
+                results = done.result()
+            for future, (ok, value) in zip(batch.futures, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+        try:
+            pending = loop.run_in_executor(self.executor, _parse_batch, batch.jobs)
+        except RuntimeError as ex:  # the executor has been shut down
+            pending = loop.create_future()
+            pending.set_exception(ex)
+        pending.add_done_callback(dispatch)
@@ -0,0 +1,95 @@
+"""Space out the requests sent to each dongle"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+__all__ = (
+    "LimiterStats",
+    "RequestLimiter",
+    "limiter_for",
+    "remove_rate_limit",
+    "set_rate_limit",
+)
+
+
+class LimiterStats(NamedTuple):
+    requests: int
+    waits: int
+    total_wait: float
+    max_wait: float
+
+
+class RequestLimiter:
+    # pylint: disable=too-many-instance-attributes
+    """
+    Token bucket for one dongle: up to `burst` requests back to back, then
+    one every `min_interval` seconds.
+
+    Each request reserves the next free slot when it arrives, so contending
+    callers are served in arrival order. Reservations are taken under a
+    thread lock, which lets pollers running their own event loops share
+    a dongle.
+    """
+
+    def __init__(self, min_interval: float, burst: int = 1):
+        if min_interval < 0 or burst < 1:
+            raise ValueError("min_interval must be >= 0 and burst >= 1")
+        self.min_interval = min_interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        # the time at which the bucket is full again
+        self._full_at = 0.0
+        self._requests = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def reserve(self) -> float:
+        """Reserve the next slot and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            full_at = max(self._full_at, now)
+            delay = max(0.0, full_at - self.min_interval * (self.burst - 1) - now)
+            self._full_at = full_at + self.min_interval
+
+            self._requests += 1
+            if delay > 0:
+                self._waits += 1
+                self._total_wait += delay
+                self._max_wait = max(self._max_wait, delay)
+        return delay
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self) -> LimiterStats:
+        with self._lock:
+            return LimiterStats(
+                self._requests, self._waits, self._total_wait, self._max_wait
+            )
+
+
+_LIMITERS: Dict[Tuple[str, int], RequestLimiter] = {}
+
+
+def set_rate_limit(
+    host: str, port: int = 80, min_interval: float = 1.0, burst: int = 1
+) -> RequestLimiter:
+    """
+    Limit the requests of all the http clients of this process
+    to the dongle at `host`:`port`, and return the limiter.
+    """
+    limiter = _LIMITERS[(host, port)] = RequestLimiter(min_interval, burst)
+    return limiter
+
+
+def remove_rate_limit(host: str, port: int = 80) -> None:
+    _LIMITERS.pop((host, port), None)
+
+
+def limiter_for(host: str, port: int = 80) -> Optional[RequestLimiter]:
+    return _LIMITERS.get((host, port))
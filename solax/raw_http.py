@@ -0,0 +1,241 @@
+"""Minimal HTTP/1.1 client on top of asyncio protocols"""
+
+import asyncio
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+__all__ = ("HttpResponse", "TransportError", "close", "parse_response", "request")
+
+
+class TransportError(Exception):
+    """Indicates a failed request, for transports other than aiohttp"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class HttpResponse(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    consumed: int
+    keep_alive: bool
+
+
+def _parse_chunks(buffer, start: int) -> Optional[Tuple[bytes, int]]:
+    body = bytearray()
+    position = start
+    while True:
+        line_end = buffer.find(b"\r\n", position)
+        if line_end < 0:
+            return None
+        try:
+            size = int(bytes(buffer[position:line_end]).split(b";")[0], 16)
+        except ValueError as ex:
+            raise TransportError("Malformed chunked response") from ex
+        position = line_end + 2
+        chunk_end = position + size
+        if size == 0:
+            if buffer.startswith(b"\r\n", position):
+                return bytes(body), position + 2
+            trailer_end = buffer.find(b"\r\n\r\n", position)
+            if trailer_end < 0:
+                return None
+            return bytes(body), trailer_end + 4
+        if len(buffer) < chunk_end + 2:
+            return None
+        body += buffer[position:chunk_end]
+        position = chunk_end + 2
+
+
+def _parse_head(head: bytes) -> Tuple[int, Dict[str, str], bool]:
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    version, _, reason = status_line.partition(" ")
+    status = reason[:3]
+    if not version.startswith("HTTP/") or not status.isdigit():
+        raise TransportError(f"Malformed status line {status_line!r}")
+    headers: Dict[str, str] = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection == "keep-alive" or (
+        version == "HTTP/1.1" and connection != "close"
+    )
+    return int(status), headers, keep_alive
+
+
+def parse_response(buffer, eof: bool = False) -> Optional[HttpResponse]:
+    """
+    Parse the first response of `buffer`, or return None if more bytes
+    are needed. `eof` tells that the peer closed its side, which ends
+    bodies delimited by the end of the connection.
+    """
+    header_end = buffer.find(b"\r\n\r\n")
+    if header_end < 0:
+        if eof:
+            raise TransportError("Connection closed before the response headers")
+        return None
+
+    status, headers, keep_alive = _parse_head(bytes(buffer[:header_end]))
+    start = header_end + 4
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = _parse_chunks(buffer, start)
+        if chunks is None:
+            if eof:
+                raise TransportError("Connection closed within a chunked body")
+            return None
+        body, consumed = chunks
+    elif "content-length" in headers:
+        consumed = start + int(headers["content-length"])
+        if len(buffer) < consumed:
+            if eof:
+                raise TransportError("Connection closed before the end of the body")
+            return None
+        body = bytes(buffer[start:consumed])
+    else:
+        if not eof:
+            return None
+        body = bytes(buffer[start:])
+        consumed = len(buffer)
+        keep_alive = False
+
+    return HttpResponse(status, headers, body, consumed, keep_alive)
+
+
+class _HttpProtocol(asyncio.Protocol):
+    def __init__(self) -> None:
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed = False
+        self._buffer = bytearray()
+        self._eof = False
+        self._waiter: Optional[asyncio.Future] = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        self._wake()
+
+    def eof_received(self) -> bool:
+        self._eof = True
+        self._wake()
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.closed = True
+        self._eof = True
+        if exc is not None and self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(TransportError(str(exc)))
+        self._wake()
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is None or waiter.done():
+            return
+        try:
+            response = parse_response(self._buffer, self._eof)
+        except TransportError as ex:
+            waiter.set_exception(ex)
+            return
+        if response is not None:
+            del self._buffer[: response.consumed]
+            waiter.set_result(response)
+
+    async def send(self, payload: bytes) -> HttpResponse:
+        assert self.transport is not None
+        self._waiter = asyncio.get_running_loop().create_future()
+        self.transport.write(payload)
+        try:
+            return await self._waiter
+        finally:
+            self._waiter = None
+
+    def close(self) -> None:
+        assert self.transport is not None
+        self.closed = True
+        self.transport.close()
+
+
+class _ConnectionPool:
+    def __init__(self) -> None:
+        self._idle: Dict[Tuple[str, int], List[_HttpProtocol]] = {}
+
+    def close(self, host: str, port: int) -> None:
+        for protocol in self._idle.pop((host, port), []):
+            protocol.close()
+
+    async def _connect(self, host: str, port: int) -> _HttpProtocol:
+        loop = asyncio.get_running_loop()
+        try:
+            _, protocol = await loop.create_connection(_HttpProtocol, host, port)
+        except OSError as ex:
+            raise TransportError(f"Cannot connect to {host}:{port}: {ex}") from ex
+        return protocol
+
+    async def request(self, host: str, port: int, payload: bytes) -> HttpResponse:
+        idle = self._idle.setdefault((host, port), [])
+        while idle:
+            protocol = idle.pop()
+            if protocol.closed:
+                continue
+            try:
+                response = await self._send(protocol, payload)
+            except TransportError:
+                # the inverter may have dropped an idle connection
+                continue
+            self._release(protocol, response, idle)
+            return response
+
+        protocol = await self._connect(host, port)
+        response = await self._send(protocol, payload)
+        self._release(protocol, response, idle)
+        return response
+
+    @staticmethod
+    async def _send(protocol: _HttpProtocol, payload: bytes) -> HttpResponse:
+        try:
+            return await protocol.send(payload)
+        except BaseException:
+            protocol.close()
+            raise
+
+    @staticmethod
+    def _release(protocol, response: HttpResponse, idle: List[_HttpProtocol]):
+        if response.keep_alive and not protocol.closed:
+            idle.append(protocol)
+        else:
+            protocol.close()
+
+
+_POOLS: "WeakKeyDictionary[asyncio.AbstractEventLoop, _ConnectionPool]" = (
+    WeakKeyDictionary()
+)
+
+
+async def request(host: str, port: int, payload: bytes, timeout: float) -> bytes:
+    """
+    Send a fully serialized request and return the body of the response.
+    Connections are kept alive and reused, per event loop.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _POOLS.get(loop)
+    if pool is None:
+        pool = _POOLS[loop] = _ConnectionPool()
+    response = await asyncio.wait_for(pool.request(host, port, payload), timeout)
+    if response.status >= 400:
+        raise TransportError(
+            f"{response.status} response from {host}:{port}", response.status
+        )
+    return response.body
+
+
+def close(host: str, port: int) -> None:
+    """Close the kept alive connections to host:port, of the running loop"""
+    pool = _POOLS.get(asyncio.get_running_loop())
+    if pool is not None:
+        pool.close(host, port)
@@ -0,0 +1,235 @@
+"""Append-only log of the raw payloads returned by the inverters"""
+
+import gzip
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import urlsplit
+
+from voluptuous import Invalid
+
+from solax.inverter import Inverter, InverterResponse
+from solax.response_parser import ResponseParser
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]
+
+__all__ = ("Frame", "FrameReader", "FrameRecorder", "replay")
+
+_LOGGER = logging.getLogger(__name__)
+
+_MAGIC = b"SOLAXRAW\x01"
+# codec and flags, payload length, timestamp, host length, class name length
+_HEADER = struct.Struct("<BIdHH")
+
+_RAW = 0
+_GZIP = 1
+_ZSTD = 2
+_CODECS = {None: _RAW, "gzip": _GZIP, "zstd": _ZSTD}
+# set on the codec of payloads which passed the schema of their inverter
+_VALIDATED = 0x80
+
+
+class Frame(NamedTuple):
+    """
+    One recorded payload, as returned by `InverterHttpClient.request()`,
+    and whether the schema of its inverter accepted it
+    """
+
+    timestamp: float
+    host: str
+    class_name: str
+    payload: bytes
+    validated: bool = False
+
+
+class FrameRecorder:
+    """
+    Append raw payloads to a length prefixed log file.
+
+    Every record carries its own header, so each payload can be compressed
+    on its own (`compression="gzip"` or `"zstd"`) while the file stays
+    append-only and can be walked with a memory map by `FrameReader`.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], compression=None):
+        if compression not in _CODECS:
+            raise ValueError(f"Unknown compression {compression!r}")
+        if compression == "zstd" and zstandard is None:  # pragma: no cover
+            raise ValueError("zstd compression requires the zstandard package")
+
+        self._codec = _CODECS[compression]
+        self._compressor: Any = (
+            zstandard.ZstdCompressor() if self._codec == _ZSTD else None
+        )
+        self._file: IO[bytes] = open(path, "ab")  # pylint: disable=R1732
+        if self._file.tell() == 0:
+            self._file.write(_MAGIC)
+
+    def write(
+        self,
+        payload: bytes,
+        host: str,
+        class_name: str,
+        timestamp: Optional[float] = None,
+        validated: bool = False,
+    ) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        if self._codec == _GZIP:
+            payload = gzip.compress(payload)
+        elif self._codec == _ZSTD:
+            payload = self._compressor.compress(payload)
+
+        encoded_host = host.encode("utf-8")
+        encoded_class_name = class_name.encode("utf-8")
+        header = _HEADER.pack(
+            self._codec | _VALIDATED if validated else self._codec,
+            len(payload),
+            timestamp,
+            len(encoded_host),
+            len(encoded_class_name),
+        )
+        self._file.write(b"".join((header, encoded_host, encoded_class_name, payload)))
+
+    def attach(self, inverter: Inverter) -> Inverter:
+        """
+        Record every payload received by the inverter from now on,
+        flagged as validated when its parser checked it
+        """
+        host = urlsplit(inverter.http_client.url).netloc
+        class_name = type(inverter).__name__
+
+        def on_payload(payload: bytes, validated: bool) -> None:
+            self.write(payload, host, class_name, validated=validated)
+
+        inverter.on_payload = on_payload
+        return inverter
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class FrameReader:
+    """
+    Iterate over the frames of a log written by `FrameRecorder`.
+    The file is memory mapped and never loaded as a whole.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self._file = open(path, "rb")  # pylint: disable=R1732
+        size = os.fstat(self._file.fileno()).st_size
+        self._map: Optional[mmap.mmap] = None
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._map[: len(_MAGIC)] != _MAGIC:
+                self.close()
+                raise ValueError(f"{path} is not a solax frame log")
+
+    def __iter__(self) -> Iterator[Frame]:
+        buffer = self._map
+        if buffer is None:
+            return
+        decompressor = zstandard.ZstdDecompressor() if zstandard else None
+        offset = len(_MAGIC)
+        while offset < len(buffer):
+            if offset + _HEADER.size > len(buffer):
+                _LOGGER.warning("Ignoring truncated frame at offset %d", offset)
+                return
+            flags, length, timestamp, host_length, name_length = _HEADER.unpack_from(
+                buffer, offset
+            )
+            codec = flags & ~_VALIDATED
+            host_offset = offset + _HEADER.size
+            name_offset = host_offset + host_length
+            payload_offset = name_offset + name_length
+            offset = payload_offset + length
+            if offset > len(buffer):
+                _LOGGER.warning("Ignoring truncated frame at offset %d", host_offset)
+                return
+
+            payload = buffer[payload_offset:offset]
+            if codec == _GZIP:
+                payload = gzip.decompress(payload)
+            elif codec == _ZSTD:
+                if decompressor is None:  # pragma: no cover
+                    raise ValueError("zstd frames require the zstandard package")
+                payload = decompressor.decompress(payload)
+            yield Frame(
+                timestamp,
+                buffer[host_offset:name_offset].decode("utf-8"),
+                buffer[name_offset:payload_offset].decode("utf-8"),
+                payload,
+                bool(flags & _VALIDATED),
+            )
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def replay(
+    frames: Iterable[Frame],
+    inverters: Iterable[Type[Inverter]],
+    skip_invalid: bool = False,
+    trusted: bool = False,
+) -> Iterator[Tuple[Frame, InverterResponse]]:
+    """
+    Decode recorded frames with the inverter class they were captured with.
+    One parser is built per class and reused for the whole batch. Frames
+    which were validated when recorded can be replayed `trusted`, skipping
+    the validation, in which case the other frames are skipped.
+    """
+    classes = {cls.__name__: cls for cls in inverters}
+    parsers: Dict[str, ResponseParser] = {}
+
+    for frame in frames:
+        if trusted and not frame.validated:
+            continue
+        parser = parsers.get(frame.class_name)
+        if parser is None:
+            cls = classes.get(frame.class_name)
+            if cls is None:
+                if skip_invalid:
+                    continue
+                raise KeyError(f"Unknown inverter class {frame.class_name}")
+            parser = parsers[frame.class_name] = cls.build_response_parser(trusted)
+        try:
+            response = parser.handle_response(frame.payload)
+        except (Invalid, ValueError):
+            if skip_invalid:
+                continue
+            raise
+        yield frame, response
@@ -1,17 +1,42 @@
 import json
 import logging
 import sys
+from array import array
 from collections import namedtuple
-from typing import Any, Callable, Dict, Generator, Optional, Tuple, Union
-
-import voluptuous as vol
-from voluptuous import Invalid, MultipleInvalid
-from voluptuous.humanize import humanize_error
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 from solax.units import SensorUnit
 from solax.utils import PackerBuilderResult, contains_none_zero_value
 
-__all__ = ("ResponseParser", "InverterResponse", "ResponseDecoder")
+if TYPE_CHECKING:  # pragma: no cover
+    import voluptuous as vol
+
+__all__ = (
+    "DecoderLayout",
+    "ResponseParser",
+    "InverterResponse",
+    "PreparsedResponse",
+    "ResponseDecoder",
+    "preparse_response",
+    "select_sensors",
+    "validation_errors",
+)
 
 if sys.version_info >= (3, 11):
     from typing import Unpack
@@ -46,20 +71,99 @@ _KEY_VER = "ver"
 _KEY_TYPE = "type"
 
 
-GenericResponseSchema = vol.All(
-    vol.Schema({vol.Required(_KEY_SERIAL): str}, extra=vol.ALLOW_EXTRA),
-    vol.Any(
-        vol.Schema({vol.Required(_KEY_VERSION): str}, extra=vol.ALLOW_EXTRA),
-        vol.Schema({vol.Required(_KEY_VER): str}, extra=vol.ALLOW_EXTRA),
-    ),
-    vol.Schema(
-        {
-            vol.Required(_KEY_TYPE): vol.Any(int, str),
-            vol.Required(_KEY_DATA): vol.Schema(contains_none_zero_value),
-        },
-        extra=vol.ALLOW_EXTRA,
-    ),
-)
+def validation_errors() -> Tuple[Type[Exception], ...]:
+    """The errors of responses failing their validation"""
+    # voluptuous is only imported when responses are validated
+    from voluptuous import Invalid  # pylint: disable=import-outside-toplevel
+
+    return (Invalid,)
+
+
+def _generic_schema() -> "vol.All":
+    schema = globals().get("GenericResponseSchema")
+    if schema is None:
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        schema = globals()["GenericResponseSchema"] = vol.All(
+            vol.Schema({vol.Required(_KEY_SERIAL): str}, extra=vol.ALLOW_EXTRA),
+            vol.Any(
+                vol.Schema({vol.Required(_KEY_VERSION): str}, extra=vol.ALLOW_EXTRA),
+                vol.Schema({vol.Required(_KEY_VER): str}, extra=vol.ALLOW_EXTRA),
+            ),
+            vol.Schema(
+                {
+                    vol.Required(_KEY_TYPE): vol.Any(int, str),
+                    vol.Required(_KEY_DATA): vol.Schema(contains_none_zero_value),
+                },
+                extra=vol.ALLOW_EXTRA,
+            ),
+        )
+    return schema
+
+
+def __getattr__(name: str):
+    # GenericResponseSchema is built on first use, as the metadata of the
+    # inverters is available without voluptuous
+    if name != "GenericResponseSchema":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _generic_schema()
+
+
+def _validate(schema, json_response: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return schema(json_response)
+    except validation_errors() as ex:
+        # pylint: disable-next=import-outside-toplevel
+        from voluptuous.humanize import humanize_error
+
+        # kept for diagnostics, such as the records of discovery probes
+        humanized = humanize_error(json_response, cast("vol.Invalid", ex))
+        setattr(ex, "humanized", humanized)
+        raise
+
+
+def _load(resp: bytes) -> Dict[str, Any]:
+    raw_json = resp.decode("utf-8").replace(",,", ",0.0,").replace(",,", ",0.0,")
+    json_response = {}
+    for key, value in json.loads(raw_json).items():
+        json_response[key.lower()] = value
+    return json_response
+
+
+def preparse_response(resp: bytes) -> Dict[str, Any]:
+    """
+    Decode a response and validate the fields common to all inverters,
+    the part of the parsing which does not depend on the inverter class.
+    """
+    return _validate(_generic_schema(), _load(resp))
+
+
+class PreparsedResponse:
+    # pylint: disable=too-few-public-methods
+    """
+    A raw response shared by several parsers, such as the ones tried by
+    discovery, which is pre-parsed once for all of them. Failures are
+    remembered and raised again to every parser.
+    """
+
+    __slots__ = ("raw", "_value", "_error")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._value: Optional[Dict[str, Any]] = None
+        self._error: Optional[Exception] = None
+
+    def value(self) -> Dict[str, Any]:
+        if self._error is not None:
+            raise self._error
+        if self._value is None:
+            try:
+                self._value = preparse_response(self.raw)
+            except Exception as ex:
+                self._error = ex
+                raise
+        return self._value
+
 
 ProcessorTuple = Tuple[Callable[[Any], Any], ...]
 SensorIndexSpec = Union[int, PackerBuilderResult]
@@ -69,39 +173,123 @@ ResponseDecoder = Dict[
 ]
 
 
+def select_sensors(
+    decoder: ResponseDecoder, sensors: Optional[Iterable[str]]
+) -> ResponseDecoder:
+    """
+    Return the part of a decoder which decodes these sensors, in the order
+    of the decoder, or the whole decoder without sensors
+    """
+    if sensors is None:
+        return decoder
+    selected = set(sensors)
+    unknown = selected.difference(decoder)
+    if unknown:
+        raise ValueError(f"Unknown sensors {sorted(unknown)}")
+    return {name: mapping for name, mapping in decoder.items() if name in selected}
+
+
+class DecoderLayout(NamedTuple):
+    """The indexes of the data array read by a decoder, packed ones included"""
+
+    indexes: FrozenSet[int]
+    max_index: int
+    # the indexes in ascending order, which `gather` copies
+    columns: Tuple[int, ...]
+
+    @property
+    def required_length(self) -> int:
+        return self.max_index + 1
+
+    @classmethod
+    def of(cls, decoder: ResponseDecoder) -> "DecoderLayout":
+        indexes: Set[int] = set()
+        for idx, *_ in decoder.values():
+            if isinstance(idx, (tuple, list)):
+                indexes.update(idx[0])
+            else:
+                indexes.add(idx)
+        return cls(frozenset(indexes), max(indexes, default=-1), tuple(sorted(indexes)))
+
+    def gather(self, data: Sequence[Any]) -> array:
+        """
+        Copy, as floats, only the values of `data` read by the decoder,
+        the others are neither copied nor converted
+        """
+        return array("d", [float(data[i]) for i in self.columns])
+
+    def compact(self, decoder: ResponseDecoder) -> ResponseDecoder:
+        """Return the decoder reading from the output of `gather` instead"""
+        position = {idx: pos for pos, idx in enumerate(self.columns)}
+        compacted: ResponseDecoder = {}
+        for name, (idx, *rest) in decoder.items():
+            if isinstance(idx, (tuple, list)):
+                idx = (tuple(position[i] for i in idx[0]), idx[1])
+            else:
+                idx = position[idx]
+            compacted[name] = (idx, *rest)  # type: ignore[assignment]
+        return compacted
+
+
 class ResponseParser:
+    # pylint: disable=too-many-instance-attributes
     def __init__(
         self,
-        schema: vol.Schema,
+        schema: "vol.Schema",
         decoder: ResponseDecoder,
         dongle_serial_number_getter: Callable[[Dict[str, Any]], Optional[str]],
         inverter_serial_number_getter: Callable[[Dict[str, Any]], Optional[str]],
+        *,
+        trusted: bool = False,
+        layout: Optional[DecoderLayout] = None,
+        decode: Optional[Callable[[Sequence[Any]], Dict[str, Any]]] = None,
+        sensors: Optional[Iterable[str]] = None,
     ) -> None:
-        self.schema = vol.And(GenericResponseSchema, schema)
+        # pylint: disable=too-many-arguments
+        import voluptuous as vol  # pylint: disable=import-outside-toplevel
+
+        self.schema = vol.And(_generic_schema(), schema)
+        self.inverter_schema = schema
+        # only the whitelisted sensors are mapped and post-processed, the
+        # layout and decode function given must be the ones of these sensors
+        decoder = select_sensors(decoder, sensors)
         self.response_decoder = decoder
         self.dongle_serial_number_getter = dongle_serial_number_getter
         self.inverter_serial_number_getter = inverter_serial_number_getter
+        # trusted responses, such as frames validated when they were recorded,
+        # skip the schemas and are only checked to hold every decoded index
+        self.trusted = trusted
+        self.layout = layout or DecoderLayout.of(decoder)
+        self._compact_decoder: Optional[ResponseDecoder] = None
+        # generated replacement of map_response, which converts the values
+        # it reads to floats when the parser is trusted
+        self._decode = decode
 
-    def _decode_map(self) -> Dict[str, SensorIndexSpec]:
+    @staticmethod
+    def _decode_map(decoder: ResponseDecoder) -> Dict[str, SensorIndexSpec]:
         sensors: Dict[str, SensorIndexSpec] = {}
-        for name, mapping in self.response_decoder.items():
+        for name, mapping in decoder.items():
             sensors[name] = mapping[0]
         return sensors
 
+    @staticmethod
     def _postprocess_gen(
-        self,
+        decoder: ResponseDecoder,
     ) -> Generator[Tuple[str, Callable[[Any], Any]], None, None]:
         """
         Return map of functions to be applied to each sensor value
         """
-        for name, mapping in self.response_decoder.items():
+        for name, mapping in decoder.items():
             (_, _, *processors) = mapping
             for processor in processors:
                 yield name, processor
 
     def map_response(self, resp_data) -> Dict[str, Any]:
+        return self._map(resp_data, self.response_decoder)
+
+    def _map(self, resp_data, decoder: ResponseDecoder) -> Dict[str, Any]:
         result = {}
-        for sensor_name, decode_info in self._decode_map().items():
+        for sensor_name, decode_info in self._decode_map(decoder).items():
             if isinstance(decode_info, (tuple, list)):
                 indexes = decode_info[0]
                 packer = decode_info[1]
@@ -110,34 +298,71 @@ class ResponseParser:
             else:
                 val = resp_data[decode_info]
             result[sensor_name] = val
-        for sensor_name, processor in self._postprocess_gen():
+        for sensor_name, processor in self._postprocess_gen(decoder):
             result[sensor_name] = processor(result[sensor_name])
         return result
 
-    def handle_response(self, resp: bytearray) -> InverterResponse:
+    def handle_response(
+        self, resp: Union[bytes, PreparsedResponse]
+    ) -> InverterResponse:
         """
         Decode response and map array result using mapping definition.
 
         Args:
-            resp (bytearray): The response
+            resp (bytes): The response, or a response already pre-parsed
 
         Returns:
             InverterResponse: The decoded and mapped interver response.
         """
+        if self.trusted:
+            raw = resp.raw if isinstance(resp, PreparsedResponse) else resp
+            return self.handle_trusted(_load(raw))
+        if isinstance(resp, PreparsedResponse):
+            return self.handle_preparsed(resp.value())
+        return self.handle_preparsed(preparse_response(resp))
+
+    def handle_preparsed(self, json_response: Dict[str, Any]) -> InverterResponse:
+        """
+        Validate a response already checked against the generic
+        schema by `preparse_response`, and map it.
+        """
+        response = _validate(self.inverter_schema, json_response)
+        decode = self._decode or self.map_response
+        return self._to_inverter_response(response, decode(response[_KEY_DATA]))
 
-        raw_json = resp.decode("utf-8").replace(",,", ",0.0,").replace(",,", ",0.0,")
-        json_response = {}
-        for key, value in json.loads(raw_json).items():
-            json_response[key.lower()] = value
+    def handle_trusted(self, json_response: Dict[str, Any]) -> InverterResponse:
+        """
+        Map a response without validating it, after checking that its data
+        holds all the indexes of the decoder. Only the values which are
+        read are gathered and converted to floats.
+        """
+        data = json_response.get(_KEY_DATA)
+        required = self.layout.required_length
+        # pylint: disable=import-outside-toplevel
+        if not isinstance(data, list) or len(data) < required:
+            from voluptuous import Invalid
 
+            raise Invalid(f"data must hold at least {required} values")
         try:
-            response = self.schema(json_response)
-        except (Invalid, MultipleInvalid) as ex:
-            _ = humanize_error(json_response, ex)
-            raise
+            if self._decode is not None:
+                return self._to_inverter_response(json_response, self._decode(data))
+            values = self.layout.gather(data)
+        except (TypeError, ValueError) as ex:
+            from voluptuous import Invalid
+
+            raise Invalid("data must hold numbers") from ex
+
+        if self._compact_decoder is None:
+            self._compact_decoder = self.layout.compact(self.response_decoder)
+        return self._to_inverter_response(
+            json_response, self._map(values, self._compact_decoder)
+        )
 
+    def _to_inverter_response(
+        self, response: Dict[str, Any], data: Dict[str, Any]
+    ) -> InverterResponse:
         return InverterResponse(
-            data=self.map_response(response[_KEY_DATA]),
+            data=data,
             dongle_serial_number=self.dongle_serial_number_getter(response),
             version=response.get(_KEY_VER, response.get(_KEY_VERSION)),
             type=response[_KEY_TYPE],
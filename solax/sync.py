@@ -0,0 +1,109 @@
+"""Blocking client for synchronous scripts"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Iterable, List, Optional, Set, Union
+
+import aiohttp
+
+from solax import RealTimeAPI
+from solax.discovery import discover
+from solax.inverter import Inverter, InverterResponse
+
+__all__ = ("SyncClient",)
+
+Pollable = Union[Inverter, RealTimeAPI]
+
+
+class SyncClient:
+    """
+    Blocking facade over the asyncio API.
+
+    The client owns an event loop running in a background thread and one
+    pooled `aiohttp.ClientSession`, both kept for the lifetime of the
+    client, so polling does not pay for a new loop and new connections
+    every time. Every method can be called from any thread.
+    """
+
+    def __init__(self, connection_limit: int = 100, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        # reentrant, as close() submits the closing of the session
+        self._lock = threading.RLock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="solax-sync", daemon=True
+        )
+        self._thread.start()
+        self._session: aiohttp.ClientSession = self._call(
+            self._create_session(connection_limit)
+        )
+
+    @staticmethod
+    async def _create_session(connection_limit: int) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=connection_limit)
+        return aiohttp.ClientSession(connector=connector)
+
+    def _call(self, coro):
+        with self._lock:
+            if self._closed:
+                coro.close()
+                raise RuntimeError("SyncClient is closed")
+            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            # the call must not keep running on the loop once given up
+            future.cancel()
+            raise
+
+    def _bind(self, target: Pollable) -> Pollable:
+        inverter = target.inverter if isinstance(target, RealTimeAPI) else target
+        if inverter.http_client.session is not self._session:
+            inverter.http_client = inverter.http_client.with_session(self._session)
+        return target
+
+    async def _get_data(self, target: Pollable) -> InverterResponse:
+        return await self._bind(target).get_data()
+
+    async def _poll_many(self, targets: Iterable[Pollable]):
+        return await asyncio.gather(
+            *(self._get_data(target) for target in targets), return_exceptions=True
+        )
+
+    def discover(
+        self, host, port=80, pwd="", **kwargs
+    ) -> Union[Inverter, Set[Inverter]]:
+        """Blocking `solax.discover`, returning inverters bound to the session"""
+        kwargs.setdefault("return_when", asyncio.FIRST_COMPLETED)
+        return self._call(discover(host, port, pwd, session=self._session, **kwargs))
+
+    def get_data(self, target: Pollable) -> InverterResponse:
+        """Blocking `get_data()` of an `Inverter` or a `RealTimeAPI`"""
+        return self._call(self._get_data(target))
+
+    def poll_many(
+        self, targets: Iterable[Pollable]
+    ) -> List[Union[InverterResponse, BaseException]]:
+        """
+        Poll all the targets concurrently and return, in the same order,
+        either their response or the exception raised while polling them.
+        """
+        return self._call(self._poll_many(list(targets)))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._call(self._session.close())
+            self._closed = True
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,8 +1,6 @@
 from numbers import Number
 from typing import List, Protocol, Tuple
 
-from voluptuous import Invalid
-
 
 class Packer(Protocol):  # pragma: no cover
     # pylint: disable=R0903
@@ -45,13 +43,22 @@ def pack_u16(*indexes: int) -> PackerBuilderResult:
     return (indexes, __u16_packer)
 
 
+def _invalid(message: str) -> Exception:
+    # voluptuous is only imported when a validation fails
+    from voluptuous import Invalid  # pylint: disable=import-outside-toplevel
+
+    return Invalid(message)
+
+
 def startswith(something):
     def inner(actual):
         if isinstance(actual, str):
             if actual.startswith(something):
                 return actual
-        raise Invalid(f"{str(actual)} does not start with {something}")
+        raise _invalid(f"{str(actual)} does not start with {something}")
 
+    # lets the manifest describe the validator
+    inner.prefix = something
     return inner
 
 
@@ -102,4 +109,4 @@ def contains_none_zero_value(value: List[Number]):
     if isinstance(value, list):
         if len(value) != 0 and any((v != 0 for v in value)):
             return value
-    raise Invalid("All elements in the list are zero")
+    raise _invalid("All elements in the list are zero")
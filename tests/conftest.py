@@ -3,4 +3,5 @@ from tests.fixtures import inverters_fixture  # noqa: F401
 from tests.fixtures import inverters_fixture_all_zero  # noqa: F401
 from tests.fixtures import inverters_garbage_fixture  # noqa: F401
 from tests.fixtures import inverters_under_test  # noqa: F401
+from tests.fixtures import probe_stats_path  # noqa: F401
 from tests.fixtures import simple_http_fixture  # noqa: F401
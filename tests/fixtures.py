@@ -3,6 +3,7 @@ from copy import copy
 
 import pytest
 
+import solax.discovery
 import solax.inverters as inverter
 from tests.samples.expected_values import (
     QVOLTHYBG33P_VALUES,
@@ -67,6 +68,14 @@ from tests.samples.responses import (
 X_FORWARDED_HEADER = {"X-Forwarded-For": "5.8.8.8"}
 
 
+@pytest.fixture()
+def probe_stats_path(tmp_path, monkeypatch):
+    """Keep the probe stats of discovery in a temporary file"""
+    path = tmp_path / "probe_successes.json"
+    monkeypatch.setattr(solax.discovery, "PROBE_STATS_PATH", path)
+    yield path
+
+
 @pytest.fixture()
 def simple_http_fixture(httpserver):
     httpserver.expect_request(
@@ -1,7 +1,9 @@
 import pytest
+import voluptuous as vol
 
-from solax.discovery import REGISTRY
+from solax.discovery import REGISTRY, _check_decoders
 from solax.inverter import Inverter
+from solax.inverters import X1Boost, X3HybridG4
 
 
 def test_all_registered_inverters_inherit_from_base():
@@ -14,3 +16,64 @@ def test_unimplemented_response_decoder():
     with pytest.raises(NotImplementedError):
         versions = Inverter.build_all_variants("localhost", 80)
         next(iter(versions)).response_decoder()
+
+
+def test_registered_decoders_fit_their_schemas():
+    for i in REGISTRY:
+        i.check_decoder()
+        assert i.decoder_layout() is i.decoder_layout()
+
+
+def test_decoder_layout():
+    layout = X3HybridG4.decoder_layout()
+    assert {169, 170} <= layout.indexes
+    assert layout.max_index == max(layout.indexes) == 170
+    assert layout.required_length == 171
+
+
+class ShortX1Boost(X1Boost):
+    _schema = vol.Schema(
+        {vol.Required("data"): vol.All([float], vol.Length(min=10))},
+        extra=vol.ALLOW_EXTRA,
+    )
+
+
+class UncheckedX1Boost(X1Boost):
+    _schema = vol.Schema(
+        {vol.Required("data"): vol.Any(vol.Length(min=100), list)},
+        extra=vol.ALLOW_EXTRA,
+    )
+
+
+def test_decoder_reading_past_the_schema(caplog):
+    with pytest.raises(ValueError, match="accepts 10 data values"):
+        ShortX1Boost.check_decoder()
+    UncheckedX1Boost.check_decoder()
+
+    _check_decoders([ShortX1Boost, X1Boost])
+    assert "Inconsistent inverter ShortX1Boost" in caplog.text
+
+
+def test_decoder_layout_gather():
+    layout = X1Boost.decoder_layout()
+    data = list(range(layout.required_length))
+    assert layout.gather(data).tolist() == [float(i) for i in layout.columns]
+    assert len(layout.compact(X1Boost.response_decoder())) == len(
+        X1Boost.response_decoder()
+    )
+
+
+def test_schema_built_once_by_the_closest_class():
+    assert X1Boost.schema() is X1Boost.schema()
+
+    class ChildOfShort(ShortX1Boost):
+        pass
+
+    class Rebuilt(ShortX1Boost):
+        @classmethod
+        def build_schema(cls):
+            return vol.Schema({})
+
+    short_schema = vars(ShortX1Boost)["_schema"]
+    assert ChildOfShort.schema() is ShortX1Boost.schema() is short_schema
+    assert Rebuilt.schema() is not short_schema
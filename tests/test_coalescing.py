@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from solax import InverterResponse
+from solax.inverter import InverterError
+from solax.inverters import X1Boost
+from tests.test_smoke import build_right_variant
+
+
+class CountingX1Boost(X1Boost):
+    requests = 0
+    fail = False
+
+    async def make_request(self) -> InverterResponse:
+        self.requests += 1
+        await asyncio.sleep(0.1)
+        if self.fail:
+            raise InverterError("boom")
+        return InverterResponse({"request": self.requests}, "SN", "1", 4, "SN")
+
+
+@pytest.fixture(name="inverter")
+def inverter_fixture():
+    return CountingX1Boost.build_all_variants("localhost", 2)[0]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_request(inverter):
+    first, second = await asyncio.gather(inverter.get_data(), inverter.get_data())
+    assert first is second
+    assert inverter.requests == 1
+
+    await inverter.get_data()
+    assert inverter.requests == 2
+
+    inverter.fail = True
+    results = await asyncio.gather(
+        inverter.get_data(), inverter.get_data(), return_exceptions=True
+    )
+    assert all(isinstance(result, InverterError) for result in results)
+    assert inverter.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_response_ttl(inverter):
+    inverter.response_ttl = 60
+    first = await inverter.get_data()
+    assert await inverter.get_data() is first
+    assert inverter.requests == 1
+
+    inverter.response_ttl = 0.05
+    await asyncio.sleep(0.1)
+    assert await inverter.get_data() is not first
+    assert inverter.requests == 2
+
+    inverter.response_ttl = 0
+    assert await inverter.get_data() is not first
+
+
+@pytest.mark.asyncio
+async def test_calls_from_another_loop(inverter):
+    first = asyncio.ensure_future(inverter.get_data())
+    await asyncio.sleep(0.01)
+    # requests are not shared with other event loops
+    loop = asyncio.get_running_loop()
+    other = await loop.run_in_executor(None, asyncio.run, inverter.get_data())
+    assert await first is not other
+    assert inverter.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelling_callers(inverter):
+    first = asyncio.ensure_future(inverter.get_data())
+    second = asyncio.ensure_future(inverter.get_data())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert (await second).data == {"request": 1}
+
+    third = asyncio.ensure_future(inverter.get_data())
+    await asyncio.sleep(0.01)
+    third.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await third
+    # the last caller went away, so did the request
+    assert (await inverter.get_data()).data == {"request": 3}
+
+
+@pytest.mark.asyncio
+async def test_coalesced_smoke(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    inverter = await build_right_variant(inverter_class, conn)
+    responses = await asyncio.gather(*(inverter.get_data() for _ in range(4)))
+    assert all(response is responses[0] for response in responses)
+    assert responses[0].data == values
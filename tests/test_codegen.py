@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from voluptuous import Invalid
+
+from solax.codegen import decoder_source, generate_decoder
+from solax.inverters import X1Boost
+from solax.units import Units
+from solax.utils import pack_u16
+from tests.fixtures import INVERTERS_UNDER_TEST
+from tests.samples.expected_values import X1_BOOST_VALUES
+from tests.samples.responses import X1_BOOST_RESPONSE
+
+
+class GeneratedX1Boost(X1Boost):
+    generate_decoder = True
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+@pytest.mark.parametrize("case", INVERTERS_UNDER_TEST)
+def test_generated_decoder_maps_like_the_parser(case, trusted):
+    class Generated(case.inverter):
+        # pylint: disable=too-few-public-methods
+        generate_decoder = True
+
+    payload = json.dumps(case.response).encode()
+    response = Generated.build_response_parser(trusted).handle_response(payload)
+    assert response.data == case.values
+    expected = case.inverter.build_response_parser().handle_response(payload)
+    assert response == expected
+
+
+def test_known_processors_are_inlined():
+    source, namespace = decoder_source(X1Boost.response_decoder())
+    assert not namespace
+    assert "d[11] * 1 + d[12] * 65536" in source
+    assert "v = v / 100" in source
+
+
+def test_unknown_callables_are_called():
+    def packer(*values):
+        return sum(values)
+
+    decoder = {
+        "packed": ((((0, 1)), packer), Units.NONE, str),
+        "empty": (pack_u16(), Units.NONE),
+    }
+    decode = generate_decoder(decoder, name="decode_custom")
+    assert decode.__name__ == "decode_custom"
+    assert decode([1, 2]) == {"packed": "3", "empty": 0.0}
+    assert generate_decoder(decoder, convert=True)(["1", "2"])["packed"] == "3.0"
+
+
+def test_generated_decoder_per_class():
+    assert GeneratedX1Boost.generated_decoder() is GeneratedX1Boost.generated_decoder()
+    assert GeneratedX1Boost.generated_decoder(True) is not (
+        GeneratedX1Boost.generated_decoder()
+    )
+
+    parser = GeneratedX1Boost.build_response_parser(trusted=True)
+    response = dict(X1_BOOST_RESPONSE, Data=["nan?"] * 100)
+    with pytest.raises(Invalid):
+        parser.handle_response(json.dumps(response).encode())
+    response = parser.handle_response(json.dumps(X1_BOOST_RESPONSE).encode())
+    assert response.data == X1_BOOST_VALUES
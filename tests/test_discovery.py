@@ -1,12 +1,19 @@
 import asyncio
+import contextlib
+import json
+from collections import Counter
+from types import SimpleNamespace
 
 import pytest
+import voluptuous as vol
 
 import solax
 from solax import InverterResponse
-from solax.discovery import REGISTRY, DiscoveryError
+from solax.discovery import REGISTRY, DiscoveryError, probe_key
 from solax.inverter import InverterError
 from solax.inverters import X1Boost
+from solax.response_parser import PreparsedResponse
+from tests.test_base_inverter import ShortX1Boost
 
 
 class DelayedX1Boost(X1Boost):
@@ -15,6 +22,10 @@ class DelayedX1Boost(X1Boost):
         return await super().get_data()
 
 
+class StrictX1Boost(X1Boost):
+    _schema = X1Boost.schema().extend({vol.Required("sn"): vol.Match("^Z")})
+
+
 class DelayedFailedX1Boost(X1Boost):
     async def make_request(self) -> InverterResponse:
         await asyncio.sleep(5)
@@ -34,6 +45,183 @@ async def test_discovery(inverters_fixture):
             assert data.serial_number == data.dongle_serial_number
 
 
+@pytest.mark.asyncio
+async def test_discovery_preparses_each_response_once(inverters_fixture, monkeypatch):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    preparsed = []
+    preparse = solax.response_parser.preparse_response
+
+    def counting_preparse(resp):
+        preparsed.append(resp)
+        return preparse(resp)
+
+    monkeypatch.setattr(solax.response_parser, "preparse_response", counting_preparse)
+    await solax.discover(*conn, return_when=asyncio.ALL_COMPLETED)
+
+    requests = {
+        inverter.http_client
+        for cls in REGISTRY
+        for inverter in cls.build_all_variants(*conn)
+    }
+    assert 0 < len(preparsed) <= len(requests) < len(REGISTRY)
+
+
+@pytest.mark.asyncio
+async def test_discovery_sends_successful_probes_first(inverters_fixture, monkeypatch):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    monkeypatch.setattr(solax.discovery, "PROBE_SUCCESSES", Counter())
+    sent = []
+    shared_request = solax.discovery._shared_request  # pylint: disable=protected-access
+
+    def recording_request(http_client):
+        sent.append(probe_key(http_client))
+        return shared_request(http_client)
+
+    monkeypatch.setattr(solax.discovery, "_shared_request", recording_request)
+    inverter = await solax.discover(*conn, inverters=[X1Boost])
+    probe = probe_key(inverter.http_client)
+    assert solax.discovery.PROBE_SUCCESSES[probe] == 1
+
+    sent.clear()
+    await solax.discover(*conn, inverters=[X1Boost], return_when=asyncio.ALL_COMPLETED)
+    assert sent[0] == probe
+    assert solax.discovery.PROBE_SUCCESSES[probe] == 2
+
+
+@pytest.mark.asyncio
+async def test_discovery_skips_unregistered_classes(inverters_fixture, monkeypatch):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    entry_points = solax.discovery._entry_points  # pylint: disable=protected-access
+
+    def without_x1_boost():
+        registered = entry_points()
+        del registered[f"{X1Boost.__module__}:X1Boost"]
+        return registered
+
+    monkeypatch.setattr(solax.discovery, "_entry_points", without_x1_boost)
+    probes = []
+    with contextlib.suppress(DiscoveryError):
+        await solax.discover(
+            *conn, return_when=asyncio.ALL_COMPLETED, on_probe=probes.append
+        )
+    tried = {probe.inverter for probe in probes}
+    assert "X1Mini" in tried
+    assert "X1Boost" not in tried
+
+
+@pytest.mark.asyncio
+async def test_discovery_checks_lazily_loaded_classes(
+    inverters_fixture, monkeypatch, caplog
+):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    entry_points = solax.discovery._entry_points  # pylint: disable=protected-access
+
+    def with_short_x1_boost():
+        registered = entry_points()
+        name = f"{X1Boost.__module__}:X1Boost"
+        registered[name] = SimpleNamespace(value=name, load=lambda: ShortX1Boost)
+        return registered
+
+    monkeypatch.setattr(solax.discovery, "_entry_points", with_short_x1_boost)
+    probes = []
+    with contextlib.suppress(DiscoveryError):
+        await solax.discover(
+            *conn, return_when=asyncio.ALL_COMPLETED, on_probe=probes.append
+        )
+    assert "X1Boost" in {probe.inverter for probe in probes}
+    assert "Inconsistent inverter ShortX1Boost" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_probe_successes_are_kept(
+    inverters_fixture, probe_stats_path, monkeypatch
+):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    for _ in range(2):
+        # as a new process, which loads the saved stats
+        monkeypatch.setattr(solax.discovery, "PROBE_SUCCESSES", Counter())
+        monkeypatch.setattr(solax.discovery, "_LOADED_STATS", set())
+        inverter = await solax.discover(*conn, inverters=[X1Boost])
+    probe = probe_key(inverter.http_client)
+    assert solax.discovery.PROBE_SUCCESSES[probe] == 2
+    assert json.loads(probe_stats_path.read_text())[0][1] == 2
+    # only the saved file is left, without temporary ones
+    assert [path.name for path in probe_stats_path.parent.iterdir()] == [
+        probe_stats_path.name
+    ]
+
+    probe_stats_path.write_text("not json")
+    monkeypatch.setattr(solax.discovery, "_LOADED_STATS", set())
+    await solax.discover(*conn, inverters=[X1Boost])
+    assert solax.discovery.PROBE_SUCCESSES[probe] == 3
+    assert json.loads(probe_stats_path.read_text())[0][1] == 1
+
+    # stats which can not be read nor written, or are not kept, are skipped
+    unwritable = probe_stats_path / "probe_successes.json"
+    monkeypatch.setattr(solax.discovery, "PROBE_STATS_PATH", unwritable)
+    await solax.discover(*conn, inverters=[X1Boost])
+    monkeypatch.setattr(solax.discovery, "PROBE_STATS_PATH", None)
+    await solax.discover(*conn, inverters=[X1Boost])
+    assert solax.discovery.PROBE_SUCCESSES[probe] == 5
+    assert json.loads(probe_stats_path.read_text())[0][1] == 1
+
+
+def test_probe_stats_merged_with_other_processes(probe_stats_path):
+    # pylint: disable=protected-access
+    (http_client,) = (
+        inverter.http_client
+        for inverter in X1Boost.build_all_variants("localhost", 80, "s3cret")
+        if inverter.http_client.query
+    )
+    probe = probe_key(http_client)
+    assert "s3cret" not in repr(probe)
+    assert probe == probe_key(http_client.replace(pwd="other", query="pwd=other"))
+
+    solax.discovery._save_probe_stats(probe_stats_path, Counter([probe]))
+    # saved meanwhile by another process
+    solax.discovery._save_probe_stats(probe_stats_path, Counter([probe, probe]))
+    assert solax.discovery._read_probe_stats(probe_stats_path) == {probe: 3}
+    assert "s3cret" not in probe_stats_path.read_text()
+
+    def failing_dump(*_):
+        raise OSError("disk full")
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(json, "dump", failing_dump)
+        solax.discovery._save_probe_stats(probe_stats_path, Counter([probe]))
+    assert solax.discovery._read_probe_stats(probe_stats_path) == {probe: 3}
+    assert len(list(probe_stats_path.parent.iterdir())) == 1
+
+
+def test_preparsed_response_remembers_failures():
+    response = PreparsedResponse(b"{}")
+    with pytest.raises(vol.Invalid) as first:
+        response.value()
+    with pytest.raises(vol.Invalid) as second:
+        response.value()
+    assert first.value is second.value
+
+
 @pytest.mark.asyncio
 async def test_real_time_api(inverters_fixture):
     conn, inverter_class, _ = inverters_fixture
@@ -45,6 +233,41 @@ async def test_real_time_api(inverters_fixture):
     assert rt_api.inverter.__class__ is inverter_class
 
 
+@pytest.mark.asyncio
+async def test_first_poll_served_by_discovery(inverters_fixture, httpserver):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    inverter = await solax.discover(*conn)
+    sent = len(httpserver.log)
+    assert (await inverter.get_data()).data == values
+    assert len(httpserver.log) == sent
+    assert (await inverter.get_data()).data == values
+    assert len(httpserver.log) == sent + 1
+
+    api = await solax.real_time_api(*conn, history_size=2, sensors=["AC Voltage"])
+    sent = len(httpserver.log)
+    assert (await api.get_data()).data == {"AC Voltage": values["AC Voltage"]}
+    assert len(httpserver.log) == sent
+    assert api.history is not None
+    assert len(api.history) == 1
+
+    inverter = await solax.discover(*conn)
+    inverter.warm_response_ttl = 0
+    sent = len(httpserver.log)
+    await inverter.get_data()
+    assert len(httpserver.log) == sent + 1
+
+    # the warm response lacks a sensor of the new selection
+    api = await solax.real_time_api(*conn, sensors=["AC Voltage"])
+    inverter = api.inverter.with_sensors(["AC Voltage", "PV1 Voltage"])
+    sent = len(httpserver.log)
+    assert (await inverter.get_data()).data["PV1 Voltage"] == values["PV1 Voltage"]
+    assert len(httpserver.log) == sent + 1
+
+
 @pytest.mark.asyncio
 async def test_discovery_cancelled_error_while_staggering(
     inverters_fixture,
@@ -111,11 +334,104 @@ async def test_discovery_not_first_completed_after_staggering(
     inverters = await solax.discover(
         *conn,
         inverters=[DelayedX1Boost, DelayedFailedX1Boost],
-        return_when=asyncio.FIRST_EXCEPTION
+        return_when=asyncio.FIRST_EXCEPTION,
     )
     assert DelayedX1Boost in {type(inverter) for inverter in inverters}
 
 
+@pytest.mark.asyncio
+async def test_discover_iter_stops_early(inverters_fixture):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    running = asyncio.all_tasks()
+    inverters = solax.discover_iter(*conn, inverters=[DelayedX1Boost, X1Boost])
+    inverter = await inverters.__anext__()
+    assert inverter.__class__ is X1Boost
+    await inverters.aclose()
+    assert asyncio.all_tasks() == running
+
+
+@pytest.mark.asyncio
+async def test_discover_iter_timeout(inverters_fixture):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with pytest.raises(DiscoveryError) as error:
+        async for _ in solax.discover_iter(
+            *conn, inverters=[DelayedX1Boost], timeout=2
+        ):
+            pass  # pragma: no cover
+    assert loop.time() - started < 5
+    assert {probe.error for probe in error.value.probes} == {"cancelled"}
+
+    inverters = solax.discover_iter(*conn, inverters=[X1Boost], timeout=30)
+    assert {type(inverter) async for inverter in inverters} == {X1Boost}
+
+
+@pytest.mark.asyncio
+async def test_discovery_probe_records(inverters_fixture):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    probes = []
+    await solax.discover(
+        *conn,
+        inverters=[X1Boost, StrictX1Boost],
+        return_when=asyncio.ALL_COMPLETED,
+        on_probe=probes.append,
+    )
+    stages = {(probe.inverter, probe.stage, probe.status) for probe in probes}
+    assert stages == {
+        ("X1Boost", "done", None),
+        ("X1Boost", "request", 500),
+        ("StrictX1Boost", "parse", None),
+        ("StrictX1Boost", "request", 500),
+    }
+
+    (rejected,) = (probe for probe in probes if probe.stage == "parse")
+    assert rejected.path == ("sn",)
+    assert "Got 'XXXXXXX'" in (rejected.error or "")
+    (found,) = (probe for probe in probes if probe.stage == "done")
+    assert found.error is None
+    assert (found.received or 0) > 0
+    assert (found.elapsed or 0) > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transport", ["aiohttp", "raw"])
+async def test_discovery_error_probe_records(simple_http_fixture, transport):
+    with pytest.raises(DiscoveryError) as error:
+        await solax.discover(
+            *simple_http_fixture, inverters=[X1Boost], transport=transport
+        )
+    assert {(probe.stage, probe.status) for probe in error.value.probes} == {
+        ("request", 500)
+    }
+
+
+@pytest.mark.asyncio
+async def test_discovery_preparse_probe_records(inverters_garbage_fixture):
+    conn, inverter_class = inverters_garbage_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    with pytest.raises(DiscoveryError) as error:
+        await solax.discover(*conn, inverters=[X1Boost])
+    (preparsed,) = (p for p in error.value.probes if p.stage == "preparse")
+    assert preparsed.path
+    assert preparsed.received
+
+
 @pytest.mark.asyncio
 async def test_discovery_no_host():
     with pytest.raises(DiscoveryError):
@@ -0,0 +1,73 @@
+import csv
+import json
+
+import pytest
+
+from solax import InverterResponse
+from solax.export import ColumnarExporter, export
+from solax.inverters import X3HybridG4
+from tests.samples.expected_values import X3_HYBRID_G4_VALUES
+
+
+def rows(count):
+    for second in range(count):
+        data = dict(X3_HYBRID_G4_VALUES, **{"Grid Power": second})
+        yield float(second), InverterResponse(data, "SXXXXXXXXX", "3.0", 14, "XXX")
+
+
+def test_export_csv(tmp_path):
+    path = tmp_path / "history.csv"
+    assert export(rows(5), X3HybridG4, path, chunk_size=2) == 5
+
+    with open(path, encoding="utf-8", newline="") as csv_file:
+        table = list(csv.DictReader(csv_file))
+    assert len(table) == 5
+    assert list(table[0]) == ["timestamp", *X3HybridG4.sensor_map()]
+    assert [row["Grid Power"] for row in table] == ["0", "1", "2", "3", "4"]
+    assert table[0]["Run mode text"] == X3_HYBRID_G4_VALUES["Run mode text"]
+
+    with open(f"{path}.units.json", encoding="utf-8") as units_file:
+        units = json.load(units_file)
+    assert units["Grid Power"]["unit"] == "W"
+    assert units["Yield total"]["is_monotonic"] == "true"
+
+
+def test_export_without_rows(tmp_path):
+    path = tmp_path / "history.csv"
+    assert export([], X3HybridG4, path) == 0
+    assert path.read_text().startswith("timestamp,")
+
+
+def test_flush_without_new_rows(tmp_path):
+    path = tmp_path / "history.csv"
+    with ColumnarExporter.for_inverter(X3HybridG4, path) as exporter:
+        for timestamp, response in rows(2):
+            exporter.write(timestamp, response)
+        exporter.flush()
+        exporter.flush()
+    assert exporter.rows == 2
+    assert len(path.read_text().splitlines()) == 3
+
+
+def test_export_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarExporter.for_inverter(X3HybridG4, tmp_path / "x", file_format="xls")
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_export_arrow(tmp_path, suffix):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # pylint: disable=import-outside-toplevel
+    import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+
+    path = tmp_path / f"history{suffix}"
+    assert export(rows(5), X3HybridG4, path, chunk_size=2) == 5
+
+    if suffix == ".parquet":
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    assert table.num_rows == 5
+    assert table.column("Grid Power").to_pylist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert table.schema.field("Run mode text").type == pyarrow.string()
+    assert table.schema.field("Grid Power").metadata[b"unit"] == b"W"
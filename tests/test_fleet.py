@@ -0,0 +1,208 @@
+import asyncio
+import math
+import multiprocessing
+import time
+
+import pytest
+
+from solax.fleet import (
+    FleetRunner,
+    Target,
+    _send_frames,
+    _serve,
+    _worker_main,
+    decode_frames,
+    encode_error,
+    encode_values,
+    shard_for,
+)
+from solax.inverter_http_client import REQUEST_TIMEOUT
+from solax.inverters import X1Boost
+
+
+def test_frames_round_trip():
+    buffer = encode_values(1, 2.0, [1.5, math.nan]) + encode_error(3, 4.0, "boom")
+    ok, error = decode_frames(buffer)
+
+    assert ok[:2] == (1, 2.0)
+    assert ok[2][0] == 1.5 and math.isnan(ok[2][1])
+    assert ok[3] is None
+    assert error == (3, 4.0, None, "boom")
+
+
+def test_shards_are_stable():
+    keys = [f"10.0.0.{i}:80" for i in range(200)]
+    before = {key: shard_for(key, 4) for key in keys}
+    after = {key: shard_for(key, 5) for key in keys}
+
+    assert set(before.values()) == {0, 1, 2, 3}
+    moved = [key for key in keys if before[key] != after[key]]
+    assert all(after[key] == 4 for key in moved)
+
+
+def collect(runner, count, deadline=60):
+    results = []
+    stop = time.monotonic() + deadline
+    while len(results) < count and time.monotonic() < stop:
+        results.extend(runner.poll(1))
+    return results
+
+
+def test_fleet_runner(inverters_fixture):
+    # pylint: disable=protected-access
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    target = Target(*conn, inverter=X1Boost)
+    missing = Target("localhost", 2, inverter=X1Boost)
+    with FleetRunner([target], workers=2, interval=0.5) as runner:
+        result = collect(runner, 1)[0]
+        assert result.target == target
+        assert result.error is None
+        assert result.data == {k: float(v) for k, v in values.items()}
+
+        runner.add(missing)
+        runner.add(missing)
+        errors = [r for r in collect(runner, 4) if r.target == missing]
+        assert errors and "DiscoveryError" in errors[0].error
+
+        runner.remove(missing)
+        # targets which are not polled are ignored
+        runner.remove(missing)
+        shard = shard_for(target.key, 2)
+        workers = runner._workers
+        workers[shard].process.kill()
+        assert collect(runner, 1)[0].target == target
+        assert runner.restarts == 1
+        assert next(runner.results()).target == target
+        runner.start()
+        assert runner.restarts == 1
+
+        # a dead worker is also restarted when its targets change
+        workers[shard].process.kill()
+        workers[shard].process.join()
+        runner.add(
+            next(
+                other
+                for other in (Target("localhost", p, X1Boost) for p in range(3, 99))
+                if shard_for(other.key, 2) == shard
+            )
+        )
+        assert runner.restarts == 2
+        workers[shard].process.kill()
+        workers[shard].process.join()
+        # frames of removed targets are dropped
+        assert not list(runner._decode(encode_error(99, 1.0, "boom")))
+
+    runner.stop()
+
+
+def test_fleet_runner_resize(inverters_fixture):
+    # pylint: disable=protected-access
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    target = Target(*conn, inverter=X1Boost)
+    others = [Target("localhost", port, X1Boost) for port in range(3, 23)]
+    runner = FleetRunner([target, *others], workers=2, interval=0.5)
+    # workers are only started with the runner
+    runner.resize(3)
+    assert runner._workers == [None] * 3
+    with pytest.raises(ValueError):
+        runner.resize(0)
+
+    with runner:
+        kept = {shard: runner._workers[shard] for shard in range(3)}
+        runner.resize(4)
+        assert runner._workers[:3] == list(kept.values())
+        for shard, worker in enumerate(runner._workers):
+            assert worker.process.is_alive()
+            assert worker.targets == {
+                target_id: polled
+                for target_id, polled in runner._targets.items()
+                if shard_for(polled.key, 4) == shard
+            }
+        assert runner._workers[3].targets
+        assert target in {r.target for r in collect(runner, len(others) + 1)}
+
+        runner.resize(1)
+        (worker,) = runner._workers
+        assert worker is kept[0]
+        assert len(worker.targets) == len(others) + 1
+        assert not any(other.process.is_alive() for other in list(kept.values())[1:])
+        results = collect(runner, 2 * (len(others) + 1))
+        assert target in {r.target for r in results}
+        assert runner.restarts == 0
+
+
+def test_worker_main():
+    parent, child = multiprocessing.Pipe()
+    parent.send(None)
+    _worker_main(child, {}, 0.1)
+    parent.close()
+    child.close()
+
+
+@pytest.mark.asyncio
+async def test_frames_sent_together():
+    parent, child = multiprocessing.Pipe()
+    frames: "asyncio.Queue[bytes]" = asyncio.Queue()
+    for target_id in range(3):
+        frames.put_nowait(encode_error(target_id, 1.0, "boom"))
+    sender = asyncio.create_task(_send_frames(child, frames))
+    received = await asyncio.get_running_loop().run_in_executor(None, parent.recv_bytes)
+    assert [frame[0] for frame in decode_frames(received)] == [0, 1, 2]
+    sender.cancel()
+    parent.close()
+    child.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_each_frame_once_polled(inverters_fixture):
+    # pylint: disable=too-many-locals
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    async def hang(reader, _):
+        await reader.read()
+
+    server = await asyncio.start_server(hang, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    targets = {
+        0: Target(*conn, inverter=X1Boost),
+        1: Target("127.0.0.1", port, inverter=X1Boost),
+        2: Target("localhost", port, inverter=X1Boost),
+        3: Target("localhost", 2, inverter=X1Boost),
+    }
+    parent, child = multiprocessing.Pipe()
+    loop = asyncio.get_running_loop()
+    async with server:
+        started = loop.time()
+        worker = asyncio.create_task(_serve(child, targets, 0.5))
+        frames = list(
+            decode_frames(await loop.run_in_executor(None, parent.recv_bytes))
+        )
+        # the unreachable targets do not hold back the frames of the others
+        assert loop.time() - started < REQUEST_TIMEOUT
+        ids = [target_id for target_id, *_ in frames]
+        while ids.count(0) < 2 or 3 not in ids:
+            received = await loop.run_in_executor(None, parent.recv_bytes)
+            frames.extend(decode_frames(received))
+            ids = [target_id for target_id, *_ in frames]
+        polled = {target_id: (data, error) for target_id, _, data, error in frames}
+        assert set(polled) == {0, 3}
+        assert list(polled[0][0]) == [float(v) for v in values.values()]
+        assert "DiscoveryError" in polled[3][1]
+
+        # the polls of removed targets, then of all of them, are cancelled
+        parent.send({0: targets[0], 1: targets[1]})
+        parent.send(None)
+        await worker
+    parent.close()
+    child.close()
@@ -0,0 +1,96 @@
+import pytest
+
+import solax
+from solax import History, InverterResponse
+from solax.inverters import X1Boost, X3HybridG4
+from tests.samples.expected_values import X3_HYBRID_G4_VALUES
+
+
+def response(**data) -> InverterResponse:
+    return InverterResponse(
+        data=data,
+        dongle_serial_number="SXXXXXXXXX",
+        version="3.006.04",
+        type=14,
+        inverter_serial_number="XXXXXXX",
+    )
+
+
+def test_history_columns_match_sensor_map():
+    history = History.for_inverter(X3HybridG4, 4)
+    history.append(response(**X3_HYBRID_G4_VALUES), timestamp=1.0)
+
+    assert len(history) == 1
+    assert history.last("Grid Power") == [X3_HYBRID_G4_VALUES["Grid Power"]]
+    assert str(history.last("Run mode text")) == "[nan]"
+
+
+def test_history_wraps_around():
+    history = History.for_inverter(X1Boost, 3)
+    for second in range(5):
+        history.append(response(**{"PV1 Power": second}), timestamp=second)
+
+    assert len(history) == 3
+    assert history.last("PV1 Power", 10) == [2.0, 3.0, 4.0]
+    assert history.last("PV1 Power", 2) == [3.0, 4.0]
+    assert [list(view) for view in history.timestamps()] == [[2.0], [3.0, 4.0]]
+    assert [len(view) for view in history.column("PV1 Power", 1)] == [1]
+
+
+def test_history_window_statistics():
+    history = History.for_inverter(X1Boost, 8)
+    assert history.min("PV1 Power") is None
+    assert history.mean("PV1 Power") is None
+
+    for second, power in enumerate([100, 300, 200, 400]):
+        history.append(response(**{"PV1 Power": power}), timestamp=second)
+
+    assert history.min("PV1 Power") == 100
+    assert history.max("PV1 Power") == 400
+    assert history.mean("PV1 Power") == 250
+    assert history.min("PV1 Power", seconds=1) == 200
+    assert history.mean("PV1 Power", seconds=2) == 300
+
+
+def test_history_energy():
+    history = History.for_inverter(X1Boost, 8)
+    for hour, power in enumerate([1000, 1000, None, 2000, 4000]):
+        history.append(response(**{"PV1 Power": power}), timestamp=hour * 3600.0)
+
+    assert history.energy("PV1 Power") == 4.0
+    assert history.min("PV1 Power") == 1000
+    assert history.energy("PV1 Power", seconds=3600) == 3.0
+
+    with pytest.raises(ValueError):
+        history.energy("PV1 Voltage")
+
+
+def test_history_rejects_invalid_use():
+    with pytest.raises(ValueError):
+        History.for_inverter(X1Boost, 0)
+
+    history = History.for_inverter(X1Boost, 2)
+    history.append(response(), timestamp=2.0)
+    with pytest.raises(ValueError):
+        history.append(response(), timestamp=1.0)
+
+    history.clear()
+    history.append(response(), timestamp=1.0)
+    assert len(history) == 1
+
+
+@pytest.mark.asyncio
+async def test_real_time_api_feeds_history(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    rt_api = await solax.real_time_api(*conn, history_size=2)
+    assert rt_api.history is not None
+    await rt_api.get_data()
+    await rt_api.get_data()
+    await rt_api.get_data()
+
+    assert len(rt_api.history) == 2
+    assert rt_api.history.last("PV1 Power") == [values["PV1 Power"]]
@@ -0,0 +1,93 @@
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import solax
+from solax import response_parser
+from solax.discovery import REGISTRY, discover
+from solax.inverters import X1Boost
+
+# seconds, generous so that slow CI runners do not fail it
+IMPORT_BUDGET = 0.5
+
+
+def run_isolated(code: str):
+    script = f"import json, sys, time\n{code}\nprint(json.dumps(result))"
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True, text=True
+    )
+    return json.loads(output.stdout)
+
+
+def test_import_time_budget():
+    elapsed = run_isolated(
+        "started = time.perf_counter()\n"
+        "import solax, solax.units, solax.utils\n"
+        "result = time.perf_counter() - started"
+    )
+    assert elapsed < IMPORT_BUDGET
+
+
+def test_metadata_without_the_network_stack():
+    loaded = run_isolated(
+        "import solax, solax.units, solax.utils\n"
+        "light = sorted(sys.modules)\n"
+        "from solax.inverters import X3HybridG4\n"
+        "X3HybridG4.sensor_map()\n"
+        "result = [light, sorted(sys.modules)]"
+    )
+    light, metadata = loaded
+    assert "aiohttp" not in light
+    assert "voluptuous" not in light
+    assert "solax.inverter" not in light
+    assert "aiohttp" not in metadata
+    assert "voluptuous" not in metadata
+
+
+def test_lazy_attributes(monkeypatch):
+    assert solax.discover is discover
+    assert "discover" in vars(solax)
+    with pytest.raises(AttributeError):
+        _ = solax.not_an_attribute
+    assert solax.inverters.X1Boost is X1Boost
+    with pytest.raises(AttributeError):
+        _ = solax.inverters.NotAnInverter
+
+    # the generic schema is built again once dropped
+    monkeypatch.delattr(response_parser, "GenericResponseSchema", raising=False)
+    schema = response_parser.GenericResponseSchema
+    assert response_parser.GenericResponseSchema is schema
+
+
+def test_discovery_imports_only_fitting_inverters():
+    name, loaded = run_isolated(textwrap.dedent("""
+            import asyncio
+            from solax.discovery import discover
+            from tests.samples.responses import X1_BOOST_RESPONSE
+
+            body = json.dumps(X1_BOOST_RESPONSE).encode()
+
+            async def handle(reader, writer):
+                await reader.readuntil(b"\\r\\n\\r\\n")
+                writer.write(b"HTTP/1.1 200 OK\\r\\nConnection: close\\r\\n")
+                writer.write(b"Content-Length: %d\\r\\n\\r\\n%s" % (len(body), body))
+                writer.close()
+
+            async def main():
+                server = await asyncio.start_server(handle, "127.0.0.1", 0)
+                async with server:
+                    port = server.sockets[0].getsockname()[1]
+                    inverter = await discover("127.0.0.1", port, transport="raw")
+                return type(inverter).__name__
+
+            name = asyncio.run(main())
+            inverters = [m for m in sys.modules if m.startswith("solax.inverters.")]
+            result = [name, inverters]
+            """))
+    modules = {cls.__name__: cls.__module__ for cls in REGISTRY}
+    assert modules[name] in loaded
+    assert "solax.inverters.x3_hybrid_g4" not in loaded
+    assert len(loaded) < len(REGISTRY)
@@ -0,0 +1,42 @@
+import pytest
+
+from solax.inverter_http_client import InverterHttpClient, Method
+
+
+def client():
+    return InverterHttpClient(url="http://localhost:80/", method=Method.POST, pwd="")
+
+
+def test_replace_returns_cached_equal_clients():
+    first = client().with_default_data().with_headers({"a": "1", "b": "2"})
+    second = client().with_default_data().with_headers({"b": "2", "a": "1"})
+    assert first is second
+
+    assert client().with_default_query() is not client().with_default_data()
+    assert client().with_query("1") is not client().with_data("1")
+    assert client().with_headers({"a": "1"}) is not client().with_headers({"a": "2"})
+
+
+def test_replace_rejects_unknown_fields():
+    with pytest.raises(TypeError):
+        client().replace(nope=1)
+
+
+def test_request_parts_are_prebuilt():
+    query_client = client().with_default_query()
+    data_client = client().with_default_data()
+
+    # pylint: disable=protected-access
+    assert query_client._url == "http://localhost:80/?optType=ReadRealTimeData"
+    assert query_client._body is None
+    assert data_client._url == "http://localhost:80/"
+    assert data_client._body == b"optType=ReadRealTimeData"
+    assert data_client._address == ("localhost", 80)
+    assert data_client._raw_request.endswith(b"\r\n\r\noptType=ReadRealTimeData")
+
+
+def test_headers_are_snapshotted():
+    headers = {"X-Forwarded-For": "5.8.8.8"}
+    http_client = client().with_headers(headers)
+    headers["X-Forwarded-For"] = "1.1.1.1"
+    assert http_client.headers == {"X-Forwarded-For": "5.8.8.8"}
@@ -0,0 +1,176 @@
+import asyncio
+import gc
+from contextlib import AsyncExitStack
+
+import aiohttp
+import pytest
+
+from solax import RealTimeAPI, real_time_api
+from solax.discovery import DiscoveryError, discover
+from solax.inverter_http_client import InverterHttpClient, Method
+from solax.inverters import X1Boost
+from solax.modbus import ModbusClient, ModbusSimulator
+from tests.samples.responses import X1_BOOST_RESPONSE
+from tests.test_coalescing import CountingX1Boost
+from tests.test_smoke import build_right_variant
+
+
+@pytest.mark.asyncio
+async def test_inverter_owns_its_session(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    inverter = await build_right_variant(inverter_class, conn)
+    async with RealTimeAPI(inverter) as api:
+        assert api.inverter is inverter
+        session = inverter.http_client.session
+        assert session is not None
+        assert (await api.get_data()).data == values
+        assert (await api.get_data()).data == values
+    assert session.closed
+    assert inverter.http_client.session is None
+
+    # a session of the caller is left open
+    async with aiohttp.ClientSession() as session:
+        inverter.http_client = inverter.http_client.with_session(session)
+        async with inverter:
+            await inverter.get_data()
+        assert not session.closed
+
+
+@pytest.mark.asyncio
+async def test_http_client_context(inverters_fixture):
+    conn, inverter_class, _ = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    http_client = (await build_right_variant(inverter_class, conn)).http_client
+    async with aiohttp.ClientSession() as session:
+        async with http_client.with_session(session) as client:
+            await client.request()
+        # the session of the caller is left open
+        assert not session.closed
+
+    async with http_client as client:
+        assert client.session is not None
+        assert client is not http_client
+        async with http_client as nested:
+            assert nested.session is not client.session
+            await nested.request()
+        assert nested.session.closed
+        await client.request()
+    assert client.session.closed
+    assert http_client.session is None
+
+    # contexts of two clients, left in the order they were entered
+    other = http_client.with_headers({"X-Other": "1"})
+    first, second = AsyncExitStack(), AsyncExitStack()
+    client = await first.enter_async_context(http_client)
+    other_client = await second.enter_async_context(other)
+    await first.aclose()
+    assert client.session.closed
+    assert not other_client.session.closed
+    await second.aclose()
+    assert other_client.session.closed
+
+
+@pytest.mark.asyncio
+async def test_raw_connections_closed():
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    http_client = InverterHttpClient(
+        url=f"http://127.0.0.1:{port}/", method=Method.POST, pwd=""
+    ).with_transport("raw")
+    async with server:
+        async with http_client.with_default_data() as client:
+            assert await client.request() == b"{}"
+            assert await client.request() == b"{}"
+            assert len(connections) == 1
+        assert await client.request() == b"{}"
+        assert len(connections) == 2
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_discovery_keeps_its_session(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    api = await real_time_api(*conn, keep_session=True, sensors=["AC Voltage"])
+    session = api.inverter.http_client.session
+    assert session is not None
+    async with api:
+        response = await api.get_data()
+        assert response.data == {"AC Voltage": values["AC Voltage"]}
+    assert session.closed
+
+    with pytest.raises(ValueError):
+        await discover(*conn, keep_session=True, return_when="ALL_COMPLETED")
+    inverter = await discover(*conn, keep_session=True, transport="raw")
+    assert inverter.http_client.session is None
+    await inverter.close()
+
+
+@pytest.mark.asyncio
+async def test_discovery_closes_its_session_when_nothing_found(monkeypatch):
+    sessions = []
+    client_session = aiohttp.ClientSession
+
+    def recording_session(*args, **kwargs):
+        sessions.append(client_session(*args, **kwargs))
+        return sessions[-1]
+
+    monkeypatch.setattr(aiohttp, "ClientSession", recording_session)
+    with pytest.raises(DiscoveryError):
+        await discover("localhost", 2, inverters=[X1Boost], keep_session=True)
+    assert len(sessions) == 1
+    assert sessions[0].closed
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_the_pending_request():
+    inverter = CountingX1Boost.build_all_variants("localhost", 2)[0]
+    pending = asyncio.ensure_future(inverter.get_data())
+    await asyncio.sleep(0.01)
+    await inverter.close()
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+    assert (await inverter.get_data()).data == {"request": 2}
+
+
+@pytest.mark.asyncio
+async def test_unclosed_session_warning():
+    inverter = X1Boost.build_all_variants("localhost", 80).pop()
+    session = aiohttp.ClientSession()
+    inverter.own_session(session)
+    with pytest.warns(ResourceWarning):
+        del inverter
+        gc.collect()
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_modbus_client_context():
+    data = X1_BOOST_RESPONSE["Data"]
+    fields = {key: value for key, value in X1_BOOST_RESPONSE.items() if key != "Data"}
+    async with ModbusSimulator(data) as (host, port):
+        async with ModbusClient(host, len(data), fields, port=port) as client:
+            async with client.build_inverter(X1Boost) as inverter:
+                await inverter.get_data()
+        # a new connection is opened after the client closed its own
+        await client.build_inverter(X1Boost).get_data()
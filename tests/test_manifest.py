@@ -0,0 +1,109 @@
+import json
+
+import pytest
+import voluptuous as vol
+
+from solax.discovery import REGISTRY
+from solax.inverters import X1, X1Boost
+from solax.manifest import (
+    build_manifest,
+    build_probe,
+    describe,
+    load_manifest,
+    main,
+    matches_signature,
+)
+from tests.test_base_inverter import ShortX1Boost
+
+
+class UnvalidatedX1Boost(X1Boost):
+    _schema = vol.Schema({})
+
+
+class LooseX1Boost(X1Boost):
+    _schema = vol.Schema(
+        {
+            vol.Required("type"): vol.All(vol.Coerce(int), 4),
+            vol.Required("data"): vol.Any(vol.Length(min=100), [int]),
+        },
+        extra=vol.ALLOW_EXTRA,
+    )
+
+
+def test_shipped_manifest_is_up_to_date():
+    assert load_manifest() == json.loads(json.dumps(build_manifest(REGISTRY)))
+    assert main(["--check"]) == 0
+
+
+def test_describe():
+    entry = describe(X1Boost)
+    assert entry["class"] == "solax.inverters.x1_boost:X1Boost"
+    assert entry["type"] == {"kind": "int", "values": [4]}
+    assert entry["data_lengths"] == [[100, 100], [200, 200]]
+    assert entry["required_length"] == X1Boost.decoder_layout().required_length
+    assert {probe["query"] for probe in entry["probes"]} == {
+        "",
+        "optType=ReadRealTimeData",
+    }
+    assert entry["sensors"]["Total Generated Energy"] == {
+        "index": 11,
+        "unit": "kWh",
+        "is_monotonic": True,
+    }
+
+    assert describe(X1)["type"] == {"kind": "str", "prefix": "X1-"}
+    assert describe(UnvalidatedX1Boost)["data_lengths"] is None
+
+
+@pytest.mark.parametrize("pwd", ["", "secret"])
+def test_probes_are_the_variants(pwd):
+    manifest = load_manifest()["inverters"]
+    for cls in REGISTRY:
+        probes = manifest[cls.__name__]["pwd_probes" if pwd else "probes"]
+        built = [build_probe(probe, "10.0.0.1", 8080, pwd) for probe in probes]
+        variants = [
+            i.http_client for i in cls.build_all_variants("10.0.0.1", 8080, pwd)
+        ]
+        assert sorted(map(repr, built)) == sorted(map(repr, variants))
+
+
+def test_matches_signature():
+    response = {"type": 4, "data": [0] * 100}
+    assert matches_signature(X1Boost, response)
+    assert not matches_signature(X1Boost, dict(response, type=5))
+    assert not matches_signature(X1Boost, dict(response, type="4"))
+    assert not matches_signature(X1Boost, dict(response, data=[0] * 150))
+    assert not matches_signature(X1Boost, dict(response, data=None))
+    assert matches_signature(UnvalidatedX1Boost, dict(response, data=[0] * 150))
+
+    assert matches_signature(X1, {"type": "X1-Boost-Air-Mini", "data": [0] * 102})
+    assert not matches_signature(X1, {"type": "X3-Hybiyd-G3", "data": [0] * 102})
+
+
+def test_signature_is_never_stricter_than_the_schema():
+    assert not describe(LooseX1Boost)["type"]
+    assert describe(LooseX1Boost)["data_lengths"] is None
+    for response in ({"type": "4", "data": [0] * 50}, {"type": 4, "data": [0] * 100}):
+        LooseX1Boost.schema()(response)
+        assert matches_signature(LooseX1Boost, response)
+
+
+def test_cli(tmp_path, capsys, monkeypatch):
+    output = tmp_path / "manifest.json"
+    assert main(["-o", str(output)]) == 0
+    assert json.loads(output.read_text()) == load_manifest()
+    assert load_manifest(output) == load_manifest()
+
+    assert main([]) == 0
+    assert json.loads(capsys.readouterr().out) == load_manifest()
+
+    output.write_text("{}")
+    monkeypatch.setattr("solax.manifest.MANIFEST_PATH", output)
+    assert main(["--check"]) == 1
+
+    # classes whose schema accepts data too short for their decoder
+    with pytest.raises(ValueError):
+        describe(ShortX1Boost)
+    monkeypatch.setattr("solax.discovery.REGISTRY", {X1Boost, ShortX1Boost})
+    assert main(["--check"]) == 1
+    assert "Inconsistent inverter ShortX1Boost" in capsys.readouterr().err
@@ -0,0 +1,229 @@
+import asyncio
+import struct
+
+import pytest
+
+from solax import rate_limit
+from solax.inverter import InverterError
+from solax.inverters import X1Boost, X3HybridG4
+from solax.modbus import (
+    READ_INPUT_REGISTERS,
+    ModbusClient,
+    ModbusError,
+    ModbusSimulator,
+    _frame,
+    _ModbusProtocol,
+    plan_reads,
+    read_registers,
+    register_windows,
+    sensor_indexes,
+)
+from solax.sync import SyncClient
+from tests.fixtures import INVERTERS_UNDER_TEST
+from tests.samples.expected_values import X1_BOOST_VALUES
+from tests.samples.responses import X1_BOOST_RESPONSE
+
+OFFSET = 1000
+
+
+def test_register_windows():
+    assert not register_windows([])
+    assert register_windows([5, 1, 2, 3, 3, 7, 6]) == [(1, 3), (5, 3)]
+    assert register_windows(range(300)) == [(0, 125), (125, 125), (250, 50)]
+    assert register_windows(range(10), max_count=4) == [(0, 4), (4, 4), (8, 2)]
+    assert register_windows([1, 3, 9], max_gap=1) == [(1, 3), (9, 1)]
+    assert register_windows([1, 3, 9], max_gap=5) == [(1, 9)]
+    assert register_windows([1, 3, 9], max_count=4, max_gap=5) == [(1, 3), (9, 1)]
+
+
+def test_plan_reads():
+    sensors = ["Grid Power", "Battery Remaining Capacity"]
+    assert sensor_indexes(X3HybridG4, sensors) == {34, 35, 103}
+    assert sensor_indexes(X3HybridG4) == X3HybridG4.decoder_layout().indexes
+    with pytest.raises(ValueError):
+        sensor_indexes(X3HybridG4, ["Grid Power", "Flux Capacitor"])
+
+    assert plan_reads(X3HybridG4, sensors) == [(34, 2), (103, 1)]
+    assert plan_reads(X3HybridG4, sensors, address=OFFSET, max_gap=100) == [
+        (OFFSET + 34, 70)
+    ]
+    windows = plan_reads(X3HybridG4, max_gap=8)
+    assert windows == [(0, 55), (68, 26), (103, 4), (168, 3)]
+    assert len(plan_reads(X3HybridG4, max_count=16, max_gap=8)) > len(windows)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("case", INVERTERS_UNDER_TEST)
+async def test_modbus_transport(case):
+    data = case.response["Data"]
+    if not all(0 <= value < 2**16 for value in data):
+        pytest.skip()
+
+    fields = {key: value for key, value in case.response.items() if key != "Data"}
+    async with ModbusSimulator([0] * OFFSET + data) as (host, port):
+        client = ModbusClient(
+            host, len(data), fields, port=port, address=OFFSET, unit=7
+        )
+        response = await client.build_inverter(case.inverter).get_data()
+    assert response.data == case.values
+
+
+@pytest.mark.asyncio
+async def test_batched_reads():
+    data = X1_BOOST_RESPONSE["Data"]
+    fields = {key: value for key, value in X1_BOOST_RESPONSE.items() if key != "Data"}
+    simulator = ModbusSimulator(data + data)
+    async with simulator as (host, port):
+        client = ModbusClient(host, 200, fields, port=port)
+        assert str(client) == f"modbus://{host}:{port}/1"
+        await client.build_inverter(X1Boost).get_data()
+        assert simulator.reads == [
+            (1, READ_INPUT_REGISTERS, 0, 125),
+            (1, READ_INPUT_REGISTERS, 125, 75),
+        ]
+
+        simulator.reads.clear()
+        registers = await read_registers(host, port, register_windows([3, 1, 2, 9]))
+        assert registers == {i: data[i] for i in (1, 2, 3, 9)}
+        assert simulator.reads == [
+            (1, READ_INPUT_REGISTERS, 1, 3),
+            (1, READ_INPUT_REGISTERS, 9, 1),
+        ]
+
+        simulator.reads.clear()
+        sensors = ["AC Voltage", "PV1 Voltage", "PV2 Voltage"]
+        client = ModbusClient(
+            host, 100, fields, port=port, indexes=sensor_indexes(X1Boost, sensors)
+        )
+        response = await client.build_inverter(X1Boost).get_data()
+        for sensor in sensors:
+            assert response.data[sensor] == X1_BOOST_VALUES[sensor]
+        assert response.data["AC Frequency"] == 0
+        assert simulator.reads == [
+            (1, READ_INPUT_REGISTERS, 0, 1),
+            (1, READ_INPUT_REGISTERS, 3, 2),
+        ]
+
+        limiter = rate_limit.set_rate_limit(host, port, 0.05)
+        try:
+            await client.build_inverter(X1Boost).get_data()
+            await client.build_inverter(X1Boost).get_data()
+        finally:
+            rate_limit.remove_rate_limit(host, port)
+        assert limiter.stats().waits == 1
+
+        simulator.reads.clear()
+        client = ModbusClient(
+            host,
+            100,
+            fields,
+            port=port,
+            indexes=sensor_indexes(X1Boost, sensors),
+            max_gap=2,
+        )
+        await client.build_inverter(X1Boost).get_data()
+        assert simulator.reads == [(1, READ_INPUT_REGISTERS, 0, 5)]
+
+
+def test_sync_client_polls_modbus():
+    data = X1_BOOST_RESPONSE["Data"]
+    fields = {key: value for key, value in X1_BOOST_RESPONSE.items() if key != "Data"}
+    simulator = ModbusSimulator(data)
+    with SyncClient(timeout=10) as client:
+        # pylint: disable=protected-access
+        host, port = client._call(simulator.start())
+        inverter = ModbusClient(host, len(data), fields, port=port).build_inverter(
+            X1Boost
+        )
+        assert client.get_data(inverter).data == X1_BOOST_VALUES
+        assert client.poll_many([inverter])[0].data == X1_BOOST_VALUES
+        client._call(inverter.close())
+        client._call(simulator.stop())
+
+
+@pytest.mark.asyncio
+async def test_modbus_errors():
+    async with ModbusSimulator([0] * 10, functions=[4]) as (host, port):
+        client = ModbusClient(host, 100, port=port)
+        with pytest.raises(InverterError):
+            await client.build_inverter(X1Boost).get_data()
+        with pytest.raises(ModbusError) as error:
+            await read_registers(host, port, [(0, 20)])
+        assert error.value.code == 2
+        with pytest.raises(ModbusError) as error:
+            await read_registers(host, port, [(0, 5)], function=3)
+        assert error.value.code == 1
+        # the connection is kept after exception responses
+        assert await read_registers(host, port, [(0, 1)]) == {0: 0}
+
+    with pytest.raises(ModbusError):
+        await read_registers("localhost", 2, [(0, 1)])
+
+
+@pytest.mark.asyncio
+async def test_connection_lost_while_cancelling():
+    async def ignore(reader, _):
+        await reader.read()
+
+    server = await asyncio.start_server(ignore, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    loop = asyncio.get_running_loop()
+    async with server:
+        _, protocol = await loop.create_connection(_ModbusProtocol, "127.0.0.1", port)
+        read = asyncio.create_task(protocol.read(1, READ_INPUT_REGISTERS, 0, 1))
+        await asyncio.sleep(0.05)
+        # the connection is lost before the cancelled read gets to run
+        read.cancel()
+        protocol.connection_lost(None)
+        with pytest.raises(asyncio.CancelledError):
+            await read
+        protocol.close()
+
+    # nothing to close or stop
+    ModbusClient("127.0.0.1", 1, port=port).close_connections()
+    await ModbusSimulator([0]).stop()
+
+
+class MalformedSimulator(ModbusSimulator):
+    def respond(self, unit, pdu):
+        return bytes([pdu[0], 2, 0])
+
+
+@pytest.mark.asyncio
+async def test_broken_servers():
+    async with MalformedSimulator([0]) as (host, port):
+        with pytest.raises(ModbusError):
+            await read_registers(host, port, [(0, 1)])
+
+    async def hang_up(reader, writer):
+        await reader.read(1)
+        writer.close()
+
+    async def ignore(reader, _):
+        await reader.read()
+
+    async def stray_and_split(reader, writer):
+        transaction, _, _, unit = struct.unpack_from(
+            ">HHHB", await reader.readexactly(12)
+        )
+        writer.write(_frame((transaction + 1) % 0x10000, unit, bytes([4, 2, 0, 1])))
+        response = _frame(transaction, unit, bytes([4, 2, 0, 7]))
+        writer.write(response[:9])
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        writer.write(response[9:])
+        await reader.read()
+
+    server = await asyncio.start_server(stray_and_split, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        assert await read_registers("127.0.0.1", port, [(0, 1)]) == {0: 7}
+        for _ in range(2):
+            ModbusClient("127.0.0.1", 1, port=port).close_connections()
+
+    for handler, error in ((hang_up, ModbusError), (ignore, asyncio.TimeoutError)):
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            with pytest.raises(error):
+                await read_registers("127.0.0.1", port, [(0, 1)], timeout=0.5)
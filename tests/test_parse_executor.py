@@ -0,0 +1,102 @@
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from voluptuous import Invalid
+
+from solax.inverters import X1Boost
+from solax.parse_executor import ParseExecutor, _parse_batch
+from tests.samples.expected_values import X1_BOOST_VALUES
+from tests.samples.responses import X1_BOOST_RESPONSE
+from tests.test_smoke import build_right_variant
+
+RAW = json.dumps(X1_BOOST_RESPONSE).encode()
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.fixture(name="inverter")
+def inverter_fixture():
+    return X1Boost.build_all_variants("localhost", 80)[0]
+
+
+@pytest.mark.asyncio
+async def test_parses_in_batches(inverter):
+    with CountingExecutor(2) as pool:
+        executor = ParseExecutor(pool, max_batch=4, max_delay=0.05)
+        responses = await asyncio.gather(
+            *(executor.parse(inverter, RAW) for _ in range(6))
+        )
+    assert all(response.data == X1_BOOST_VALUES for response in responses)
+    assert pool.submitted == 2
+
+
+@pytest.mark.asyncio
+async def test_parse_errors_are_raised(inverter):
+    with ThreadPoolExecutor(1) as pool:
+        executor = ParseExecutor(pool)
+        good, bad = await asyncio.gather(
+            executor.parse(inverter, RAW),
+            executor.parse(inverter, b'{"bingo": "bango"}'),
+            return_exceptions=True,
+        )
+    assert good.data == X1_BOOST_VALUES
+    assert isinstance(bad, Invalid)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_parse(inverter):
+    with ThreadPoolExecutor(1) as pool:
+        executor = ParseExecutor(pool, max_delay=0.05)
+        cancelled = asyncio.create_task(executor.parse(inverter, RAW))
+        kept = asyncio.create_task(executor.parse(inverter, RAW))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        assert (await kept).data == X1_BOOST_VALUES
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_broken_executor(inverter):
+    pool = ThreadPoolExecutor(1)
+    pool.shutdown()
+    executor = ParseExecutor(pool)
+    with pytest.raises(RuntimeError):
+        await executor.parse(inverter, RAW)
+
+
+@pytest.mark.asyncio
+async def test_process_pool(inverter):
+    with ProcessPoolExecutor(1) as pool:
+        executor = ParseExecutor(pool)
+        response = await executor.parse(inverter, RAW)
+    assert response.data == X1_BOOST_VALUES
+
+
+def test_parsers_of_process_pool_workers(monkeypatch):
+    # what the workers run, which the coverage of this process does not see
+    parsers = {}
+    monkeypatch.setattr("solax.parse_executor._PARSERS", parsers)
+    key = (X1Boost, False, frozenset(["AC Voltage"]))
+    results = _parse_batch([(key, RAW), (key, b"{}")])
+    (ok, response), (failed, error) = results[0], results[1]
+    assert ok and response.data == {"AC Voltage": X1_BOOST_VALUES["AC Voltage"]}
+    assert not failed and isinstance(error, Invalid)
+    assert list(parsers) == [key]
+
+
+@pytest.mark.asyncio
+async def test_inverter_uses_parse_executor(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+    inverter = await build_right_variant(inverter_class, conn)
+    with ThreadPoolExecutor(1) as pool:
+        inverter.parse_executor = ParseExecutor(pool)
+        response = await inverter.get_data()
+    assert response.data == values
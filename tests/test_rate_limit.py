@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+from solax import rate_limit
+from solax.inverter_http_client import InverterHttpClient, Method
+from solax.rate_limit import RequestLimiter
+
+
+def test_burst_then_spacing():
+    limiter = RequestLimiter(min_interval=10, burst=2)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(10, abs=0.1)
+    # later callers queue up behind the earlier ones
+    assert limiter.reserve() == pytest.approx(20, abs=0.1)
+
+    stats = limiter.stats()
+    assert stats.requests == 4
+    assert stats.waits == 2
+    assert stats.total_wait == pytest.approx(30, abs=0.2)
+    assert stats.max_wait == pytest.approx(20, abs=0.1)
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        RequestLimiter(-1)
+    with pytest.raises(ValueError):
+        RequestLimiter(1, burst=0)
+
+
+@pytest.mark.asyncio
+async def test_requests_are_spaced(httpserver):
+    httpserver.expect_request("/").respond_with_data(b"{}")
+    limiter = rate_limit.set_rate_limit(httpserver.host, httpserver.port, 0.05)
+    http_client = InverterHttpClient(
+        url=httpserver.url_for("/"), method=Method.GET, pwd=""
+    )
+    try:
+        started = time.monotonic()
+        await asyncio.gather(*(http_client.request() for _ in range(3)))
+        assert time.monotonic() - started >= 0.1
+        assert limiter.stats().waits == 2
+        assert rate_limit.limiter_for(httpserver.host, httpserver.port) is limiter
+    finally:
+        rate_limit.remove_rate_limit(httpserver.host, httpserver.port)
+    assert rate_limit.limiter_for(httpserver.host, httpserver.port) is None
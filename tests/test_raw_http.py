@@ -0,0 +1,163 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+from solax.inverter import InverterError
+from solax.inverter_http_client import InverterHttpClient, Method
+from solax.inverters import X1Boost
+from solax.raw_http import TransportError, parse_response, request
+from tests.test_smoke import build_right_variant
+
+
+def test_parse_content_length():
+    raw = b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhello" + b"HTTP/1.1"
+    assert parse_response(raw[:-10]) is None
+
+    response = parse_response(raw)
+    assert response.status == 200
+    assert response.body == b"hello"
+    assert response.consumed == len(raw) - len(b"HTTP/1.1")
+    assert response.keep_alive
+
+
+def test_parse_chunked():
+    raw = (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        b"5;ext=1\r\nhello\r\n1\r\n!\r\n0\r\n\r\n"
+    )
+    for end in (len(raw) - 1, len(raw) - 4, len(raw) - 10, len(raw) - 18):
+        assert parse_response(raw[:end]) is None
+    response = parse_response(raw)
+    assert response.body == b"hello!"
+    assert response.consumed == len(raw)
+    assert not response.keep_alive
+
+    with_trailers = raw[:-2] + b"X-Checksum: 1\r\n\r\n"
+    assert parse_response(with_trailers[:-2]) is None
+    assert parse_response(with_trailers).consumed == len(with_trailers)
+
+    with pytest.raises(TransportError):
+        parse_response(raw[:-10], eof=True)
+    with pytest.raises(TransportError):
+        parse_response(raw.replace(b"5;ext=1", b"zz"))
+
+
+def test_parse_until_close():
+    raw = b"HTTP/1.0 200 OK\r\nServer: dongle\r\n\r\nhello"
+    assert parse_response(raw) is None
+
+    response = parse_response(raw, eof=True)
+    assert response.body == b"hello"
+    assert not response.keep_alive
+    keep_alive = b"Connection: keep-alive\r\nContent-Length: 5"
+    assert parse_response(raw.replace(b"Server: dongle", keep_alive)).keep_alive
+
+
+def test_parse_errors():
+    assert parse_response(b"HTTP/1.1 200") is None
+    with pytest.raises(TransportError):
+        parse_response(b"HTTP/1.1 200", eof=True)
+    with pytest.raises(TransportError):
+        parse_response(b"garbage\r\n\r\n")
+    with pytest.raises(TransportError):
+        parse_response(b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhel", eof=True)
+
+
+@pytest.mark.asyncio
+async def test_keep_alive_and_reconnect():
+    connections = []
+    requests = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            requests.append(head + await reader.readexactly(length))
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+            if len(requests) == 2:
+                writer.close()
+                return
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = InverterHttpClient(
+        url=f"http://127.0.0.1:{port}/", method=Method.POST, pwd=""
+    ).with_transport("raw")
+    client = client.with_default_data().with_headers({"X-Forwarded-For": "5.8.8.8"})
+    async with server:
+        assert await client.request() == b"{}"
+        assert await client.request() == b"{}"
+        await asyncio.sleep(0.1)
+        assert await client.request() == b"{}"
+
+    assert len(connections) == 2
+    assert requests[0].startswith(b"POST / HTTP/1.1\r\n")
+    assert b"X-Forwarded-For: 5.8.8.8\r\n" in requests[0]
+    assert requests[0].endswith(b"\r\n\r\noptType=ReadRealTimeData")
+
+
+@pytest.mark.asyncio
+async def test_stale_and_broken_connections():
+    behaviours = ["stale", "garbage", "reset"]
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        behaviour = behaviours.pop(0) if behaviours else "keep"
+        await reader.readuntil(b"\r\n\r\n")
+        if behaviour == "stale":
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+            # the next request finds the connection dropped by the inverter
+            await reader.readuntil(b"\r\n\r\n")
+        elif behaviour == "garbage":
+            writer.write(b"garbage\r\n\r\n")
+        elif behaviour == "reset":
+            sock = writer.get_extra_info("socket")
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+            )
+            writer.transport.abort()
+            return
+        else:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    payload = b"GET / HTTP/1.1\r\n\r\n"
+    async with server:
+        assert await request("127.0.0.1", port, payload, 5) == b"{}"
+        # retried on a new connection, which gets garbage
+        with pytest.raises(TransportError, match="Malformed"):
+            await request("127.0.0.1", port, payload, 5)
+        with pytest.raises(TransportError):
+            await request("127.0.0.1", port, payload, 5)
+        assert await request("127.0.0.1", port, payload, 5) == b"{}"
+    assert len(connections) == 4
+
+
+@pytest.mark.asyncio
+async def test_raw_transport_smoke(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+    inverter = await build_right_variant(inverter_class, conn)
+    inverter.http_client = inverter.http_client.with_transport("raw")
+    response = await inverter.get_data()
+    assert response.data == values
+
+
+@pytest.mark.asyncio
+async def test_raw_transport_errors(httpserver):
+    httpserver.expect_request("/").respond_with_data("nope", status=500)
+    inverter = X1Boost.build_all_variants(httpserver.host, httpserver.port)[0]
+    inverter.http_client = inverter.http_client.with_transport("raw")
+    with pytest.raises(InverterError):
+        await inverter.get_data()
+
+    with pytest.raises(TransportError):
+        await request("localhost", 2, b"GET / HTTP/1.1\r\n\r\n", 1)
+
+    with pytest.raises(ValueError):
+        inverter.http_client.with_transport("carrier-pigeon")
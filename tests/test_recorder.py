@@ -0,0 +1,202 @@
+import json
+
+import pytest
+from voluptuous import Invalid
+
+from solax.discovery import REGISTRY
+from solax.inverter import InverterError
+from solax.inverters import X1Boost, X3HybridG4
+from solax.recorder import Frame, FrameReader, FrameRecorder, replay
+from tests.fixtures import INVERTERS_UNDER_TEST
+from tests.samples.expected_values import X1_BOOST_VALUES, X3_HYBRID_G4_VALUES
+from tests.samples.responses import X1_BOOST_RESPONSE, X3_HYBRID_G4_RESPONSE
+from tests.test_smoke import build_right_variant
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_record_and_replay(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+
+    path = tmp_path / "frames.log"
+    with FrameRecorder(path, compression=compression) as recorder:
+        recorder.write(json.dumps(X1_BOOST_RESPONSE).encode(), "a:80", "X1Boost", 1.0)
+    with FrameRecorder(path, compression=compression) as recorder:
+        recorder.write(
+            json.dumps(X3_HYBRID_G4_RESPONSE).encode(),
+            "b:80",
+            "X3HybridG4",
+            2.0,
+            validated=True,
+        )
+        recorder.flush()
+        assert len(list(FrameReader(path))) == 2
+
+    with FrameReader(path) as reader:
+        frames = list(reader)
+        decoded = list(replay(reader, REGISTRY))
+        trusted = list(replay(reader, REGISTRY, trusted=True))
+
+    assert [(f.timestamp, f.host, f.class_name, f.validated) for f in frames] == [
+        (1.0, "a:80", "X1Boost", False),
+        (2.0, "b:80", "X3HybridG4", True),
+    ]
+    assert decoded[0][1].data == X1_BOOST_VALUES
+    assert decoded[1][1].data == X3_HYBRID_G4_VALUES
+    # frames which were not validated when recorded are not trusted
+    assert [frame for frame, _ in trusted] == frames[1:]
+    assert trusted[0][1].data == X3_HYBRID_G4_VALUES
+
+
+def test_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        FrameRecorder(tmp_path / "frames.log", compression="lz4")
+
+
+def test_reader_rejects_foreign_files(tmp_path):
+    path = tmp_path / "frames.log"
+    path.write_bytes(b"definitely not frames")
+    with pytest.raises(ValueError):
+        FrameReader(path)
+
+
+def test_reader_handles_empty_and_truncated_files(tmp_path):
+    path = tmp_path / "frames.log"
+    path.write_bytes(b"")
+    with FrameReader(path) as reader:
+        assert not list(reader)
+
+    with FrameRecorder(path) as recorder:
+        recorder.write(b"{}", "a:80", "X1Boost")
+        recorder.write(b"{}", "a:80", "X1Boost")
+    content = path.read_bytes()
+
+    path.write_bytes(content[:-1])
+    with FrameReader(path) as reader:
+        assert len(list(reader)) == 1
+
+    record_size = (len(content) - len(b"SOLAXRAW\x01")) // 2
+    path.write_bytes(content[: len(content) - record_size + 4])
+    with FrameReader(path) as reader:
+        assert len(list(reader)) == 1
+
+
+def test_replay_invalid_frames():
+    frames = [
+        Frame(1.0, "a:80", "Unknown", b"{}"),
+        Frame(2.0, "a:80", "X1Boost", b"{}"),
+        Frame(3.0, "a:80", "X1Boost", b"garbage"),
+        Frame(4.0, "a:80", "X1Boost", json.dumps(X1_BOOST_RESPONSE).encode()),
+    ]
+    decoded = list(replay(frames, [X1Boost], skip_invalid=True))
+    assert [frame.timestamp for frame, _ in decoded] == [4.0]
+
+    with pytest.raises(KeyError):
+        list(replay(frames[:1], [X1Boost]))
+    with pytest.raises(Invalid):
+        list(replay(frames[1:2], [X1Boost]))
+
+
+@pytest.mark.parametrize("case", INVERTERS_UNDER_TEST)
+def test_trusted_replay(case):
+    payload = json.dumps(case.response).encode()
+    frame = Frame(1.0, "a:80", case.inverter.__name__, payload, validated=True)
+    ((_, response),) = replay([frame], [case.inverter], trusted=True)
+    assert response.data == case.values
+
+
+def test_trusted_replay_checks_bounds():
+    response = dict(X1_BOOST_RESPONSE, Data=X1_BOOST_RESPONSE["Data"][:50])
+    frames = [Frame(1.0, "a:80", "X1Boost", json.dumps(response).encode(), True)]
+    with pytest.raises(Invalid):
+        list(replay(frames, [X1Boost], trusted=True))
+    assert not list(replay(frames, [X1Boost], skip_invalid=True, trusted=True))
+
+
+@pytest.mark.asyncio
+async def test_recorder_attached_to_inverter(inverters_fixture, tmp_path):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X3HybridG4:
+        pytest.skip()
+
+    path = tmp_path / "frames.log"
+    inverter = await build_right_variant(inverter_class, conn)
+    with FrameRecorder(path) as recorder:
+        recorder.attach(inverter)
+        assert "using" in str(inverter.http_client)
+        assert inverter.http_client.url.startswith("http://")
+        await inverter.get_data()
+
+    with FrameReader(path) as reader:
+        ((frame, response),) = replay(reader, [inverter_class], trusted=True)
+    assert frame.host == f"{conn[0]}:{conn[1]}"
+    assert frame.validated
+    assert response.data == values
+
+
+@pytest.mark.asyncio
+async def test_recorder_flags_unvalidated_payloads(inverters_fixture, tmp_path):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X3HybridG4:
+        pytest.skip()
+
+    path = tmp_path / "frames.log"
+    inverter = await build_right_variant(inverter_class, conn)
+    with FrameRecorder(path) as recorder:
+        # payloads parsed by trusted parsers and payloads which failed
+        # their schema are recorded, but not as validated ones
+        trusted = recorder.attach(inverter_class(inverter.http_client, trusted=True))
+        await trusted.with_sensors(["Grid 1 Voltage"]).get_data()
+        mismatched = recorder.attach(X1Boost(inverter.http_client))
+        with pytest.raises(InverterError):
+            await mismatched.get_data()
+
+    with FrameReader(path) as reader:
+        frames = list(reader)
+        assert not list(replay(reader, [inverter_class], trusted=True))
+    assert [(frame.class_name, frame.validated) for frame in frames] == [
+        ("X3HybridG4", False),
+        ("X1Boost", False),
+    ]
+    ((_, response),) = replay(frames, [inverter_class, X1Boost], skip_invalid=True)
+    assert response.data == values
+
+
+@pytest.mark.asyncio
+async def test_recorder_attached_to_inverter_context(inverters_fixture, tmp_path):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X3HybridG4:
+        pytest.skip()
+
+    path = tmp_path / "frames.log"
+    inverter = await build_right_variant(inverter_class, conn)
+    with FrameRecorder(path) as recorder:
+        async with recorder.attach(inverter):
+            assert inverter.http_client.session is not None
+            await inverter.get_data()
+        inverter.http_client = inverter.http_client.with_transport("raw")
+        await inverter.get_data()
+        assert inverter.http_client.session is None
+
+    with FrameReader(path) as reader:
+        decoded = list(replay(reader, [inverter_class]))
+    assert [response.data for _, response in decoded] == [values, values]
+
+
+def test_trusted_replay_gathers_only_decoded_values():
+    layout = X1Boost.decoder_layout()
+    data = ["not a number"] * layout.required_length
+    for i in layout.columns:
+        data[i] = X1_BOOST_RESPONSE["Data"][i]
+    response = dict(X1_BOOST_RESPONSE, Data=data)
+    frames = [Frame(1.0, "a:80", "X1Boost", json.dumps(response).encode(), True)] * 2
+    for _, decoded in replay(frames, [X1Boost], trusted=True):
+        assert decoded.data == X1_BOOST_VALUES
+
+    data[layout.max_index] = "not a number"
+    frames = [Frame(1.0, "a:80", "X1Boost", json.dumps(response).encode(), True)]
+    with pytest.raises(Invalid):
+        list(replay(frames, [X1Boost], trusted=True))
@@ -0,0 +1,90 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from solax import RealTimeAPI, real_time_api
+from solax.history import History
+from solax.inverters import X1Boost, X3HybridG4
+from solax.parse_executor import ParseExecutor
+from tests.samples.expected_values import X3_HYBRID_G4_VALUES
+from tests.samples.responses import X3_HYBRID_G4_RESPONSE
+
+SENSORS = ["Grid Power", "Battery Remaining Capacity"]
+RAW = json.dumps(X3_HYBRID_G4_RESPONSE).encode()
+EXPECTED = {name: X3_HYBRID_G4_VALUES[name] for name in SENSORS}
+
+
+class GeneratedX3HybridG4(X3HybridG4):
+    generate_decoder = True
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+@pytest.mark.parametrize("cls", [X3HybridG4, GeneratedX3HybridG4])
+def test_parser_decodes_only_the_sensors(cls, trusted):
+    parser = cls.build_response_parser(trusted, SENSORS)
+    assert list(parser.response_decoder) == SENSORS
+    assert parser.layout.required_length == 104
+    assert parser.handle_response(RAW).data == EXPECTED
+
+
+def test_unknown_sensors():
+    with pytest.raises(ValueError):
+        X3HybridG4.build_response_parser(sensors=["Grid Power", "Flux Capacitor"])
+    with pytest.raises(ValueError):
+        X3HybridG4.sensor_map(["Flux Capacitor"])
+
+
+def test_sensor_map():
+    inverter = X3HybridG4.build_all_variants("localhost", 80).pop()
+    api = RealTimeAPI(inverter, sensors=reversed(SENSORS))
+    assert api.inverter is not inverter
+    assert api.inverter.http_client is inverter.http_client
+    assert api.inverter.sensors == frozenset(SENSORS)
+    assert list(api.sensor_map()) == SENSORS
+    assert api.sensor_map() == X3HybridG4.sensor_map(SENSORS)
+    assert len(RealTimeAPI(inverter).sensor_map()) == len(X3HybridG4.sensor_map())
+    assert api.inverter.sensor_map() == api.sensor_map()
+    assert list(api.inverter.sensor_map(["Grid Power"])) == ["Grid Power"]
+    assert type(api.inverter).sensor_map() == inverter.sensor_map()
+
+    history = History.for_inverter(api.inverter, 2)
+    history.append(api.inverter.response_parser.handle_response(RAW), 1.0)
+    assert len(history) == 1
+
+
+def test_with_sensors_keeps_overrides():
+    inverter = X3HybridG4.build_all_variants("localhost", 80).pop()
+    inverter.response_ttl = 3.0
+    inverter.warm_response_ttl = 0.0
+    selected = inverter.with_sensors(SENSORS)
+    assert selected.response_ttl == 3.0
+    assert selected.warm_response_ttl == 0.0
+    assert selected.parse_executor is None
+    assert "parse_executor" not in vars(selected)
+
+
+@pytest.mark.asyncio
+async def test_process_pool_parses_only_the_sensors():
+    inverter = X3HybridG4(
+        X3HybridG4.build_all_variants("localhost", 80).pop().http_client,
+        sensors=SENSORS,
+    )
+    with ProcessPoolExecutor(1) as pool:
+        response = await ParseExecutor(pool).parse(inverter, RAW)
+    assert response.data == EXPECTED
+
+
+@pytest.mark.asyncio
+async def test_real_time_api_with_sensors(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    api = await real_time_api(*conn, history_size=2, sensors=["AC Voltage"])
+    assert api.inverter.__class__ is inverter_class
+    response = await api.get_data()
+    assert response.data == {"AC Voltage": values["AC Voltage"]}
+    assert api.history is not None
+    assert len(api.history) == 1
@@ -0,0 +1,60 @@
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import solax
+from solax import InverterResponse
+from solax.inverter import InverterError
+from solax.inverters import X1Boost
+from solax.sync import SyncClient
+
+
+def test_sync_client(inverters_fixture):
+    conn, inverter_class, values = inverters_fixture
+
+    if inverter_class is not X1Boost:
+        pytest.skip()
+
+    with SyncClient() as client:
+        inverter = client.discover(*conn)
+        assert inverter.__class__ is inverter_class
+        assert client.get_data(inverter).data == values
+
+        rt_api = solax.RealTimeAPI(inverter_class.build_all_variants(*conn)[0])
+        assert client.get_data(rt_api).data == values
+
+        with ThreadPoolExecutor(4) as pool:
+            responses = list(pool.map(client.get_data, [inverter] * 8))
+        assert all(response.data == values for response in responses)
+
+        broken = inverter_class.build_all_variants("localhost", 2)[0]
+        response, error = client.poll_many([inverter, broken])
+        assert response.data == values
+        assert isinstance(error, InverterError)
+
+    client.close()
+    with pytest.raises(RuntimeError):
+        client.get_data(inverter)
+
+
+class HangingX1Boost(X1Boost):
+    cancelled = threading.Event()
+
+    async def make_request(self) -> InverterResponse:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+        raise AssertionError("not cancelled")  # pragma: no cover
+
+
+def test_timed_out_calls_are_cancelled():
+    inverter = HangingX1Boost.build_all_variants("localhost", 2)[0]
+    with SyncClient(timeout=0.1) as client:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            client.get_data(inverter)
+        assert HangingX1Boost.cancelled.wait(5)